@@ -18,15 +18,22 @@ logging.getLogger('numpy').setLevel(logging.ERROR)
 
 import time
 import json
+import hashlib
+import uuid
+import sqlite3
+import queue
+import threading
 import logging
+from logging.handlers import RotatingFileHandler
 import numpy as np
 from datetime import datetime
 import httpx
-from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
-from typing import List, Dict, Any, Optional, Generator
+from typing import List, Dict, Any, Optional, Generator, Iterable
 
 load_dotenv()
 
@@ -34,26 +41,66 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Optional imports for RAG (lazy loading to speed up startup)
+# Errors from every module are also kept in a size-capped file
+error_log_handler = RotatingFileHandler('error_log.txt', maxBytes=10_000_000, backupCount=3, delay=True)
+error_log_handler.setLevel(logging.ERROR)
+error_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+logging.getLogger().addHandler(error_log_handler)
+
+from lazy_modules import lazy_import
+
+# Optional imports for RAG (imported on first use to speed up startup)
 try:
-    from sklearn.neighbors import NearestNeighbors
-    from sentence_transformers import SentenceTransformer
+    sklearn_neighbors = lazy_import('sklearn.neighbors')
+    sentence_transformers = lazy_import('sentence_transformers')
     RAG_AVAILABLE = True
 except ImportError:
     RAG_AVAILABLE = False
     logger.warning("RAG dependencies not available. RAG features will be disabled.")
 
-from brain_of_the_doctor import encode_image, analyze_image_with_query
-from voice_of_the_patient import transcribe_with_groq
-from voice_of_the_doctor import text_to_speech_with_gtts, text_to_speech_with_elevenlabs
-from database import db
+# Optional torch handle for quantizing the RAG embedder (installed with sentence-transformers)
+try:
+    torch = lazy_import('torch')
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+# Optional FAISS index for RAG retrieval (falls back to sklearn NearestNeighbors)
+try:
+    faiss = lazy_import('faiss')
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+# Optional fast JSON serialization (falls back to Flask's stdlib json)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# JSON (de)serialization for stored report/message metadata
+if ORJSON_AVAILABLE:
+    json_loads = orjson.loads
+    
+    def json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+else:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+from brain_of_the_doctor import stream_image_with_query
+from voice_of_the_doctor import text_to_speech_with_fallback, stream_text_to_speech_with_fallback, stream_llm_to_speech
+from database import db, JSONB_AVAILABLE
+from http_client import start_warm_up
+from embedding_batcher import EmbeddingBatcher
 from severity_classifier import severity_classifier
 from question_generator import question_generator
 from auth_system import auth_system
 
 # Import new feature modules
 from session_memory import session_manager
-from response_cache import response_cache, symptom_tree
+from response_cache import response_cache, semantic_cache, symptom_tree, LRUCache, EmbeddingCache
 from rash_detector import rash_detector
 from positive_messaging import positive_messaging
 from weekly_monitor import weekly_monitor
@@ -67,164 +114,364 @@ from safety_guardrails import check_safety, validate_medication_info
 # ✅ Import REAL AI Dynamic Symptom Engine (Conference-Ready)
 from dynamic_symptom_engine import dynamic_engine
 
-# Helper function to determine options for any question
-def get_options_for_question(question: str) -> list:
-    """Determine appropriate options based on question content"""
-    q_lower = question.lower()
-    
-    # Standard questions
-    if 'age' in q_lower and 'your age' in q_lower:
-        return ['Under 18', '18-30', '31-45', '46-60', 'Over 60']
-    elif 'scale' in q_lower or ('severe' in q_lower and '1-10' in q_lower):
-        return ['1-3 (Mild)', '4-6 (Moderate)', '7-10 (Severe)']
-    elif 'medication' in q_lower or 'medicine' in q_lower:
-        return ['None', 'Paracetamol', 'Ibuprofen', 'Aspirin', 'Other']
-    elif 'other symptom' in q_lower:
-        return ['Fever', 'Fatigue', 'Body pain', 'Weakness', 'None', 'Other']
-    
-    # Location/Duration questions
-    elif 'where' in q_lower and 'located' in q_lower:
-        return ['Forehead', 'One side', 'Back of head', 'Top of head', 'All over']
-    elif 'how long' in q_lower:
-        if 'cough' in q_lower:
-            return ['1-3 days', '4-7 days', '1-2 weeks', 'More than 2 weeks']
-        else:
-            return ['Less than 1 hour', '1-6 hours', '6-24 hours', '1-3 days', 'More than 3 days']
-    elif 'how many days' in q_lower:
-        return ['1-2 days', '3-5 days', '6-7 days', 'More than a week']
-    
-    # Pain/Pattern questions
-    elif 'constant' in q_lower or 'comes and goes' in q_lower:
-        return ['Constant', 'Comes and goes', 'Pulsating/Throbbing']
-    elif 'painful to swallow' in q_lower:
-        return ['Very painful', 'Moderately painful', 'Slightly painful', 'No']
-    
-    # Associated symptoms
-    elif 'nausea' in q_lower or 'vomiting' in q_lower:
-        return ['Yes, nausea', 'Yes, vomiting', 'Both', 'No']
-    elif 'sensitivity' in q_lower and ('light' in q_lower or 'sound' in q_lower):
-        return ['Light sensitivity', 'Sound sensitivity', 'Both', 'No']
-    elif 'dizziness' in q_lower or 'vision' in q_lower:
-        return ['Dizziness', 'Blurred vision', 'Both', 'No']
-    elif 'stress' in q_lower or 'sleep' in q_lower:
-        return ['Yes, stressed', 'Yes, lack of sleep', 'Both', 'No']
-    
-    # Respiratory questions
-    elif 'dry' in q_lower and 'wet' in q_lower:
-        return ['Dry cough', 'Wet cough with phlegm', 'Both types']
-    elif 'sore throat' in q_lower:
-        return ['Yes', 'No', 'Mild']
-    elif 'breathlessness' in q_lower or 'chest tightness' in q_lower:
-        return ['Yes, severe', 'Yes, mild', 'No']
-    elif 'blocked' in q_lower or 'runny' in q_lower:
-        return ['Blocked nose', 'Runny nose', 'Both']
-    elif 'sneezing' in q_lower:
-        return ['Yes, frequently', 'Yes, occasionally', 'No']
-    elif 'watery eyes' in q_lower:
-        return ['Yes', 'No']
-    elif 'loss of smell' in q_lower or 'loss of taste' in q_lower:
-        return ['Yes, complete loss', 'Yes, partial loss', 'No']
-    elif 'worse at night' in q_lower or 'during the day' in q_lower:
-        return ['Worse at night', 'Worse during day', 'Same all day']
-    
-    # Fever/Temperature questions
-    elif 'temperature' in q_lower or 'how high' in q_lower:
-        return ['Below 100°F', '100-102°F', '102-104°F', 'Above 104°F', 'Not measured']
-    elif 'chills' in q_lower or 'shivering' in q_lower:
-        return ['Yes, severe', 'Yes, mild', 'No']
-    
-    # Throat questions
-    elif 'white patches' in q_lower:
-        return ['Yes', 'No', 'Not sure']
-    elif 'neck glands' in q_lower or 'swollen glands' in q_lower:
-        return ['Yes, very swollen', 'Yes, slightly swollen', 'No']
-    
-    # History questions
-    elif 'similar' in q_lower or 'before' in q_lower:
-        return ['Yes, frequently', 'Yes, occasionally', 'First time', 'Not sure']
-    
-    # Generic fallback
-    else:
-        return ['Yes', 'No', 'Not sure']
+# Structured symptom flow helpers (optional; the endpoints using them report 503 without)
+try:
+    from simple_symptom_flow import detect_possible_cause, build_home_remedies, recommend_medicine, build_warnings, SymptomRequest, AgeRange, PainGroup
+    SIMPLE_SYMPTOM_FLOW_AVAILABLE = True
+except ImportError:
+    SIMPLE_SYMPTOM_FLOW_AVAILABLE = False
+    logger.warning("simple_symptom_flow not available. /symptom/submit will be disabled.")
 
 # RAG Configuration
 class RAGConfig:
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"
     VECTOR_DIM = 384
+    # int8 dynamic quantization on CPU / fp16 on GPU for faster query encoding
+    QUANTIZE_EMBEDDER = os.environ.get('RAG_QUANTIZE_EMBEDDER', 'true').lower() == 'true'
+    # Load the embedder at startup instead of on the first retrieval
+    WARM_UP = os.environ.get('RAG_WARM_UP', 'false').lower() == 'true'
+    TORCH_THREADS = int(os.environ.get('RAG_TORCH_THREADS', os.cpu_count() or 1))
+    EMBEDDING_CACHE_PATH = os.environ.get('RAG_EMBEDDING_CACHE_PATH', 'rag_embeddings.db')
+    DOCUMENT_CACHE_DIR = os.environ.get('RAG_DOCUMENT_CACHE_DIR', 'rag_cache')
     DOCUMENTS = [
         {"text": "Common cold symptoms include runny nose, sore throat, and cough.", "metadata": {"source": "general_medical"}},
         {"text": "For fever above 102°F, consider taking acetaminophen or ibuprofen.", "metadata": {"source": "medication_guide"}},
         {"text": "COVID-19 symptoms may include fever, cough, and difficulty breathing.", "metadata": {"source": "cdc_guidelines"}}
     ]
 
-# Initialize RAG components lazily
+# Column layout of the corpus: retrieval indexes straight into these
+# instead of copying a per-document dict
+DOC_TEXTS = np.array([doc["text"] for doc in RAGConfig.DOCUMENTS], dtype=object)
+DOC_METADATA = [doc["metadata"] for doc in RAGConfig.DOCUMENTS]
+DOC_EMBS = None  # float16 [n_docs, VECTOR_DIM], L2-normalized
+
+def rag_cache_path(extension: str) -> str:
+    """Cache file for artifacts derived from the corpus, keyed by model, settings and document texts"""
+    digest = hashlib.sha256(
+        "\n".join([RAGConfig.EMBEDDING_MODEL, str(RAGConfig.QUANTIZE_EMBEDDER), 'float16'] + DOC_TEXTS.tolist()).encode()
+    ).hexdigest()[:16]
+    return os.path.join(RAGConfig.DOCUMENT_CACHE_DIR, f"{digest}.{extension}")
+
+def load_document_embeddings(embedder) -> np.ndarray:
+    """Load the corpus embeddings from the .npy cache (memory-mapped), encoding them on a miss"""
+    path = rag_cache_path('npy')
+    
+    if os.path.exists(path):
+        return np.load(path, mmap_mode='r')
+    
+    # Stored as float16: half the memory/mmap footprint, well within cosine ranking precision
+    embeddings = np.ascontiguousarray(
+        embedder.encode(DOC_TEXTS.tolist(), normalize_embeddings=True), dtype=np.float16
+    )
+    try:
+        os.makedirs(RAGConfig.DOCUMENT_CACHE_DIR, exist_ok=True)
+        np.save(path, embeddings)
+    except OSError as e:
+        logger.warning(f"Could not cache document embeddings: {str(e)}")
+    return embeddings
+
+def load_faiss_index(embedder):
+    """Memory-map the persisted FAISS index, building and saving it on a miss"""
+    global DOC_EMBS
+    path = rag_cache_path('faiss')
+    
+    if os.path.exists(path):
+        try:
+            # Pages are shared between workers through the OS page cache
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP)
+        except RuntimeError:
+            # Not every index type supports mmap in every faiss build
+            return faiss.read_index(path)
+    
+    # Encode documents (already L2-normalized)
+    DOC_EMBS = load_document_embeddings(embedder)
+    
+    # Inner product over L2-normalized vectors is cosine similarity;
+    # the index keeps its vectors in fp16 as well
+    index = faiss.IndexScalarQuantizer(
+        RAGConfig.VECTOR_DIM, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+    )
+    index.add(np.asarray(DOC_EMBS, dtype=np.float32))
+    try:
+        os.makedirs(RAGConfig.DOCUMENT_CACHE_DIR, exist_ok=True)
+        faiss.write_index(index, path)
+    except (OSError, RuntimeError) as e:
+        logger.warning(f"Could not cache FAISS index: {str(e)}")
+    return index
+
+# RAG components are loaded by a background thread, at startup with
+# RAG_WARM_UP=true, otherwise on the first retrieval
 rag_embedder = None
+rag_batcher = None
 rag_nn = None
-_rag_initialized = False
+rag_index = None
+_rag_ready = threading.Event()
+_rag_init_lock = threading.Lock()
+_rag_loader_lock = threading.Lock()
+_rag_loader = None
 
-def initialize_rag():
-    """Lazy initialization of RAG components"""
-    global rag_embedder, rag_nn, _rag_initialized
-    
-    if _rag_initialized:
+# Query embeddings and retrieval results are reused for repeated queries;
+# the embedding cache (backed by a SQLite file) is opened with the embedder
+rag_embedding_cache = None
+rag_results_cache = LRUCache(capacity=1024)
+
+def optimize_embedder(embedder):
+    """Shrink the embedder's Linear layers to fp16 (GPU) or dynamic int8 (CPU)"""
+    torch.set_num_threads(RAGConfig.TORCH_THREADS)
+    if not RAGConfig.QUANTIZE_EMBEDDER:
         return
     
+    try:
+        if embedder.device.type == 'cuda':
+            embedder.half()
+        else:
+            torch.quantization.quantize_dynamic(embedder, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        logger.info(f"Optimized RAG embedder for {embedder.device.type}")
+    except Exception as e:
+        logger.warning(f"Embedder quantization failed, using full precision: {str(e)}")
+
+def initialize_rag():
+    """Load the embedder and build the document index (runs once, off the request path)"""
+    with _rag_init_lock:
+        if _rag_ready.is_set():
+            return
+        _load_rag_components()
+
+def _load_rag_components():
+    """Build the RAG components; on failure they stay None and retrieval is skipped"""
+    global rag_embedder, rag_batcher, rag_nn, rag_index, rag_embedding_cache, DOC_EMBS
+    
     try:
         logger.info("Initializing RAG components...")
-        rag_embedder = SentenceTransformer(RAGConfig.EMBEDDING_MODEL)
+        rag_embedder = sentence_transformers.SentenceTransformer(RAGConfig.EMBEDDING_MODEL)
+        if TORCH_AVAILABLE:
+            optimize_embedder(rag_embedder)
         
-        # Encode documents
-        document_texts = [doc["text"] for doc in RAGConfig.DOCUMENTS]
-        document_embeddings = rag_embedder.encode(document_texts)
+        if FAISS_AVAILABLE:
+            rag_index = load_faiss_index(rag_embedder)
+        else:
+            # Encode documents (already L2-normalized)
+            DOC_EMBS = load_document_embeddings(rag_embedder)
+            
+            # Initialize and fit NearestNeighbors
+            rag_nn = sklearn_neighbors.NearestNeighbors(n_neighbors=min(3, len(DOC_TEXTS)), metric='cosine')
+            rag_nn.fit(DOC_EMBS)
         
-        # Initialize and fit NearestNeighbors
-        rag_nn = NearestNeighbors(n_neighbors=min(3, len(document_texts)), metric='cosine')
-        rag_nn.fit(document_embeddings)
+        # Concurrent query encodes share one batched forward pass
+        rag_batcher = EmbeddingBatcher(rag_embedder)
+        # Same model as the semantic cache; one copy per process
+        semantic_cache.use_embedder(rag_embedder)
+        rag_embedding_cache = EmbeddingCache(RAGConfig.EMBEDDING_MODEL, capacity=4096, db_path=RAGConfig.EMBEDDING_CACHE_PATH)
         
-        _rag_initialized = True
+        _rag_ready.set()
         logger.info(f"Initialized RAG with {len(RAGConfig.DOCUMENTS)} documents")
     except Exception as e:
         logger.error(f"Failed to initialize RAG: {str(e)}")
         rag_embedder = None
         rag_nn = None
+        rag_index = None
+
+def start_rag_loading():
+    """Start loading the RAG components in the background (once per process)"""
+    global _rag_loader
+    with _rag_loader_lock:
+        if _rag_loader is None:
+            _rag_loader = threading.Thread(target=initialize_rag, name="rag-warmup", daemon=True)
+            _rag_loader.start()
+
+if RAG_AVAILABLE and (RAGConfig.WARM_UP or semantic_cache.enabled):
+    # Load the model while the server starts instead of inside the first
+    # request; the semantic cache reuses it and misses until it is ready
+    start_rag_loading()
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson's C serializer"""
+    
+    @staticmethod
+    def _options(indent: bool) -> int:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=self.default, option=self._options(kwargs.get('indent'))).decode('utf-8')
+    
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """jsonify(): put orjson's bytes straight into the body (no str decode/re-encode)"""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+# Auth tables share the chat database; importing auth_system does no I/O
+auth_system.create_auth_tables()
 
 app = Flask(__name__, static_folder='static', static_url_path='')
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
+CORS_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000"]
+CORS_METHODS = ["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+CORS_HEADERS = ["Content-Type", "Authorization"]
 CORS(app, resources={
     r"/api/*": {
-        "origins": ["http://localhost:3000", "http://127.0.0.1:3000"],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
+        "origins": CORS_ORIGINS,
+        "methods": CORS_METHODS,
+        "allow_headers": CORS_HEADERS,
         "supports_credentials": True
     }
 })
 
+# Preflight answers are identical for every /api route, so build them once
+# per allowed origin; browsers may cache them for 10 minutes
+PREFLIGHT_HEADERS = {
+    origin: {
+        'Access-Control-Allow-Origin': origin,
+        'Access-Control-Allow-Methods': ', '.join(CORS_METHODS),
+        'Access-Control-Allow-Headers': ', '.join(CORS_HEADERS),
+        'Access-Control-Allow-Credentials': 'true',
+        'Access-Control-Max-Age': '600',
+        'Vary': 'Origin'
+    }
+    for origin in CORS_ORIGINS
+}
+
+@app.before_request
+def answer_cors_preflight():
+    """Short-circuit CORS preflight before route dispatch (other origins fall through to flask_cors)"""
+    if request.method == 'OPTIONS' and request.path.startswith('/api/'):
+        headers = PREFLIGHT_HEADERS.get(request.headers.get('Origin'))
+        if headers:
+            return Response(status=204, headers=headers)
+
+@app.before_request
+def bind_request_time():
+    """Read the clock once per request; handlers use g.now / g.now_iso"""
+    # Static assets never look at the timestamp
+    if request.endpoint == 'static':
+        return
+    g.now = datetime.now()
+    g.now_iso = g.now.isoformat()
+
+@app.teardown_request
+def release_db_connection(exc):
+    """Return the request thread's SQLite connection to the pool"""
+    db.release_connection()
+
+def stream_json_list(key: str, items: Iterable[Dict[str, Any]], conn=None) -> Response:
+    """
+    Stream {"success": true, <key>: [...], "count": n} one item at a time,
+    so the first rows go out while the cursor is still being read
+    """
+    def generate():
+        count = 0
+        try:
+            yield '{"success": true, "%s": [' % key
+            for item in items:
+                yield (',' if count else '') + app.json.dumps(item)
+                count += 1
+            yield '], "count": %d}' % count
+        finally:
+            if conn is not None:
+                conn.close()
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+# Write statements shared by several endpoints; sqlite3 keeps prepared
+# statements in a per-connection cache keyed by the SQL text
+SQL_UPDATE_PROFILE = '''
+    UPDATE user_profiles 
+    SET name = ?, age = ?, gender = ?, weight_kg = ?, height_cm = ?,
+        blood_group = ?, allergies = ?, chronic_conditions = ?,
+        current_medications = ?, past_injuries = ?, updated_at = ?
+    WHERE user_id = ?
+'''
+
+SQL_INSERT_PROFILE = '''
+    INSERT INTO user_profiles 
+    (user_id, name, age, gender, weight_kg, height_cm, blood_group,
+     allergies, chronic_conditions, current_medications, past_injuries, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Reports are stored as JSONB where SQLite supports it (older rows and
+# builds hold TEXT); json(report_data) returns text for either form
+SQL_REPORT_JSON = 'jsonb(?)' if JSONB_AVAILABLE else '?'
+SQL_REPORT_VALID = 'json_valid(report_data, 6)' if JSONB_AVAILABLE else 'json_valid(report_data)'
+
+SQL_INSERT_REPORT = f'''
+    INSERT INTO reports (report_id, session_id, report_data, created_at)
+    VALUES (?, ?, {SQL_REPORT_JSON}, ?)
+'''
+
+# Read size for streaming a stored report out of SQLite
+# (Connection.blobopen needs Python 3.11+)
+REPORT_READ_CHUNK = 64 * 1024
+SQLITE_BLOB_IO = hasattr(sqlite3.Connection, 'blobopen')
+
 # RAG Utility Functions
+def _pack_results(indices, similarities, n_docs):
+    """Keep in-range neighbor ids with their float32 scores"""
+    mask = (indices >= 0) & (indices < n_docs)
+    return indices[mask].astype(np.int32), similarities[mask].astype(np.float32)
+
+def encode_query(query: str) -> np.ndarray:
+    """Embed a query, reusing the cached vector for repeated queries"""
+    vector = rag_embedding_cache.get(query)
+    if vector is None:
+        vector = rag_batcher.encode(query.lower().strip())
+        rag_embedding_cache.put(query, vector)
+    # Copy so in-place normalization never touches the cached vector
+    return np.array(vector, dtype=np.float32).reshape(1, -1)
+
 def retrieve_relevant_documents(query: str, k: int = 3) -> List[Dict[str, Any]]:
     """Retrieve relevant documents using semantic search"""
-    # Initialize RAG on first use
-    if not _rag_initialized:
-        initialize_rag()
+    if not RAG_AVAILABLE:
+        return []
+    start_rag_loading()
+    # Don't block requests on loading; answer without RAG until it's ready
+    if not _rag_ready.wait(timeout=0.1):
+        logger.warning("RAG still loading, skipping retrieval")
+        return []
     
-    if rag_embedder is None or rag_nn is None:
+    if rag_batcher is None or (rag_nn is None and rag_index is None):
         logger.warning("RAG not properly initialized")
         return []
     
+    cache_key = f"{k}_{query.lower().strip()}"
+    cached = rag_results_cache.get(cache_key)
+    if cached is not None:
+        return [doc.copy() for doc in cached]
+    
     try:
         # Encode the query
-        query_embedding = rag_embedder.encode([query])
+        query_embedding = encode_query(query)
         
         # Find nearest neighbors
-        distances, indices = rag_nn.kneighbors(query_embedding)
+        if rag_index is not None:
+            query_embedding = np.ascontiguousarray(query_embedding, dtype='float32')
+            faiss.normalize_L2(query_embedding)
+            similarities, indices = rag_index.search(query_embedding, min(k, rag_index.ntotal))
+        else:
+            distances, indices = rag_nn.kneighbors(query_embedding)
+            similarities = 1.0 - distances  # Convert distance to similarity score
         
         # Get the most relevant documents
-        results = []
-        for idx, score in zip(indices[0], distances[0]):
-            if 0 <= idx < len(RAGConfig.DOCUMENTS):
-                doc = RAGConfig.DOCUMENTS[idx].copy()  # Create a copy to avoid modifying the original
-                doc['score'] = float(1.0 - score)  # Convert distance to similarity score
-                results.append(doc)
-        
-        return results
+        doc_ids, scores = _pack_results(
+            np.ascontiguousarray(indices[0], dtype=np.int64),
+            np.ascontiguousarray(similarities[0], dtype=np.float32),
+            len(DOC_TEXTS)
+        )
+        results = [
+            {'text': DOC_TEXTS[idx], 'metadata': DOC_METADATA[idx], 'score': score}
+            for idx, score in zip(doc_ids.tolist(), scores.tolist())
+        ]
+        
+        rag_results_cache.put(cache_key, results, ttl=0)
+        return [doc.copy() for doc in results]
     except Exception as e:
         logger.error(f"Error in retrieve_relevant_documents: {str(e)}")
         return []
@@ -246,6 +493,225 @@ def health_check():
             'timestamp': int(time.time())
         }), 500
 
+# ========== 🔊 Text-to-Speech Endpoints ==========
+
+# Per-response audio files (streamed voice answers and queued synthesis)
+TTS_AUDIO_DIR = os.path.join(app.static_folder, 'tts')
+os.makedirs(TTS_AUDIO_DIR, exist_ok=True)
+
+@app.route('/api/tts', methods=['POST'])
+def stream_tts():
+    """
+    Stream synthesized speech as it is generated
+    
+    The client starts playback at the first chunk instead of waiting for the
+    whole MP3. Chunks are also written to static/tts/<id>.mp3 (URL in the
+    X-Audio-URL header) so the audio stays available once the stream ends.
+    """
+    try:
+        data = request.get_json()
+        text = data.get('text')
+        
+        if not text:
+            return jsonify({'error': 'Text required'}), 400
+        
+        # Per-request file, renamed into place once the stream completes
+        response_id = uuid.uuid4().hex
+        output_filepath = os.path.join(TTS_AUDIO_DIR, f"{response_id}.mp3")
+        partial_filepath = f"{output_filepath}.part"
+        # The TTS worker also prunes old files from static/tts
+        start_tts_worker()
+        
+        # While ElevenLabs keeps failing this goes straight to gTTS
+        audio_stream = stream_text_to_speech_with_fallback(text, partial_filepath)
+        # Pull the first chunk here so setup errors still return JSON
+        first_chunk = next(audio_stream, b'')
+        
+        def generate():
+            yield first_chunk
+            yield from audio_stream
+            os.replace(partial_filepath, output_filepath)
+        
+        response = Response(stream_with_context(generate()), mimetype='audio/mpeg')
+        response.headers['X-Audio-URL'] = f"/tts/{response_id}.mp3"
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error streaming speech: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/chat/voice', methods=['POST'])
+def stream_voice_answer():
+    """
+    Answer a message with speech, overlapping LLM decoding and TTS
+    
+    The LLM response is streamed, split into sentences and each sentence is
+    synthesized as soon as it is complete.
+    """
+    try:
+        data = request.get_json()
+        message = data.get('message')
+        
+        if not message:
+            return jsonify({'error': 'Message is required'}), 400
+        
+        # Each answer gets its own file so concurrent requests can't overwrite
+        # each other; it is renamed into place once the stream completes
+        response_id = uuid.uuid4().hex
+        output_filepath = os.path.join(TTS_AUDIO_DIR, f"{response_id}.mp3")
+        partial_filepath = f"{output_filepath}.part"
+        # The TTS worker also prunes old files from static/tts
+        start_tts_worker()
+        
+        # Emergencies and unsafe requests get their fixed reply read out
+        emergency_check = detect_emergency(message)
+        safety_check = check_safety(message)
+        if emergency_check['is_emergency']:
+            audio_stream = stream_text_to_speech_with_fallback(emergency_check['message'], partial_filepath)
+        elif not safety_check['safe']:
+            audio_stream = stream_text_to_speech_with_fallback(safety_check['message'], partial_filepath)
+        elif (cached_response := semantic_cache.get(message)) is not None:
+            # A near-identical question was answered recently
+            audio_stream = stream_text_to_speech_with_fallback(cached_response, partial_filepath)
+        else:
+            token_stream = stream_image_with_query(
+                query=message,
+                model="meta-llama/llama-4-scout-17b-16e-instruct",
+                encoded_image=None,
+                system_prompt=get_system_prompt()
+            )
+            
+            def caching_token_stream():
+                tokens = []
+                for token in token_stream:
+                    tokens.append(token)
+                    yield token
+                semantic_cache.put(message, "".join(tokens))
+            
+            audio_stream = stream_llm_to_speech(caching_token_stream(), partial_filepath)
+        
+        # Wait for the first audio chunk so setup errors still return JSON
+        first_chunk = next(audio_stream, b'')
+        if not first_chunk:
+            # e.g. the LLM stream failed before producing a sentence
+            os.remove(partial_filepath)
+            return jsonify({'error': 'No speech could be generated for this message'}), 502
+        
+        def generate():
+            yield first_chunk
+            yield from audio_stream
+            os.replace(partial_filepath, output_filepath)
+        
+        response = Response(stream_with_context(generate()), mimetype='audio/mpeg')
+        response.headers['X-Audio-URL'] = f"/tts/{response_id}.mp3"
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error streaming voice answer: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Background synthesis: the text answer is returned right away and the audio
+# is rendered by a worker thread, then polled via /api/tts-status/<id>
+tts_queue = queue.Queue()
+tts_worker_lock = threading.Lock()
+tts_worker_thread = None
+
+# Rendered audio (and failure markers) are deleted after this many seconds
+TTS_FILE_TTL = 30 * 60
+TTS_PRUNE_INTERVAL = 60
+
+def prune_tts_files(max_age: float = TTS_FILE_TTL):
+    """Delete audio, partial and .failed files in static/tts older than max_age"""
+    cutoff = time.time() - max_age
+    for entry in os.scandir(TTS_AUDIO_DIR):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            # Renamed or pruned by another request/process meanwhile
+            pass
+
+def tts_worker():
+    """Synthesize queued responses into static/tts/<response_id>.mp3"""
+    last_prune = 0.0
+    while True:
+        if time.time() - last_prune >= TTS_PRUNE_INTERVAL:
+            try:
+                prune_tts_files()
+            except OSError as e:
+                logger.error(f"Error pruning synthesized speech: {str(e)}")
+            last_prune = time.time()
+        try:
+            response_id, text = tts_queue.get(timeout=TTS_PRUNE_INTERVAL)
+        except queue.Empty:
+            continue
+        output_filepath = os.path.join(TTS_AUDIO_DIR, f"{response_id}.mp3")
+        # Write to a temporary name so status checks never see a partial file
+        partial_filepath = f"{output_filepath}.part"
+        try:
+            text_to_speech_with_fallback(text, partial_filepath)
+            os.replace(partial_filepath, output_filepath)
+        except Exception as e:
+            logger.error(f"Error synthesizing speech for {response_id}: {str(e)}")
+            # Leave a marker so status checks report the failure
+            with open(os.path.join(TTS_AUDIO_DIR, f"{response_id}.failed"), 'w') as marker:
+                marker.write(str(e))
+            if os.path.exists(partial_filepath):
+                os.remove(partial_filepath)
+        finally:
+            tts_queue.task_done()
+
+def start_tts_worker():
+    """Start the synthesis thread on first use instead of at import"""
+    global tts_worker_thread
+    with tts_worker_lock:
+        if tts_worker_thread is None:
+            tts_worker_thread = threading.Thread(target=tts_worker, name="tts-worker", daemon=True)
+            tts_worker_thread.start()
+
+@app.route('/api/tts/async', methods=['POST'])
+def queue_tts():
+    """Queue speech synthesis and return immediately with the future audio URL"""
+    try:
+        data = request.get_json()
+        text = data.get('text')
+        
+        if not text:
+            return jsonify({'error': 'Text required'}), 400
+        
+        response_id = uuid.uuid4().hex
+        start_tts_worker()
+        tts_queue.put((response_id, text))
+        
+        return jsonify({
+            'response_id': response_id,
+            'audio_url': f"/tts/{response_id}.mp3",
+            'audio_ready': False
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Error queueing speech: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/tts-status/<response_id>', methods=['GET'])
+def get_tts_status(response_id):
+    """Check whether queued audio is ready (200), still rendering (202) or failed (500)"""
+    response_id = secure_filename(response_id)
+    audio_ready = os.path.exists(os.path.join(TTS_AUDIO_DIR, f"{response_id}.mp3"))
+    
+    if not audio_ready and os.path.exists(os.path.join(TTS_AUDIO_DIR, f"{response_id}.failed")):
+        return jsonify({
+            'response_id': response_id,
+            'audio_ready': False,
+            'error': 'Speech synthesis failed'
+        }), 500
+    
+    return jsonify({
+        'response_id': response_id,
+        'audio_url': f"/tts/{response_id}.mp3",
+        'audio_ready': audio_ready
+    }), 200 if audio_ready else 202
+
 # ========== Profile Management Endpoints ==========
 
 @app.route('/api/profile/save', methods=['POST'])
@@ -277,23 +743,12 @@ def save_profile():
         
         if existing:
             # Update existing profile
-            cursor.execute('''
-                UPDATE user_profiles 
-                SET name = ?, age = ?, gender = ?, weight_kg = ?, height_cm = ?,
-                    blood_group = ?, allergies = ?, chronic_conditions = ?,
-                    current_medications = ?, past_injuries = ?, updated_at = ?
-                WHERE user_id = ?
-            ''', (name, age, gender, weight, height, blood_group, allergies, 
-                  conditions, medications, injuries, datetime.now(), user_id))
+            cursor.execute(SQL_UPDATE_PROFILE, (name, age, gender, weight, height, blood_group, allergies, 
+                  conditions, medications, injuries, g.now, user_id))
         else:
             # Insert new profile
-            cursor.execute('''
-                INSERT INTO user_profiles 
-                (user_id, name, age, gender, weight_kg, height_cm, blood_group,
-                 allergies, chronic_conditions, current_medications, past_injuries, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (user_id, name, age, gender, weight, height, blood_group,
-                  allergies, conditions, medications, injuries, datetime.now(), datetime.now()))
+            cursor.execute(SQL_INSERT_PROFILE, (user_id, name, age, gender, weight, height, blood_group,
+                  allergies, conditions, medications, injuries, g.now, g.now))
         
         conn.commit()
         conn.close()
@@ -506,15 +961,31 @@ def get_cache_stats():
     """Get cache statistics"""
     try:
         stats = response_cache.get_stats()
+        stats['semantic'] = semantic_cache.get_stats()
         return jsonify(stats), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/cache/embed_stats', methods=['GET'])
+def get_embed_cache_stats():
+    """Get RAG embedding/retrieval cache statistics"""
+    try:
+        return jsonify({
+            'embeddings': rag_embedding_cache.get_stats() if rag_embedding_cache is not None else None,
+            'retrieval': rag_results_cache.get_stats()
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/cache/clear', methods=['POST'])
 def clear_cache():
     """Clear response cache"""
     try:
         response_cache.clear_cache()
+        semantic_cache.clear()
+        if rag_embedding_cache is not None:
+            rag_embedding_cache.clear()
+        rag_results_cache.clear()
         return jsonify({'success': True, 'message': 'Cache cleared'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -596,14 +1067,14 @@ def generate_report():
             return jsonify({'error': 'No assessment found for this session'}), 404
         
         content = row[0]
-        metadata = json.loads(row[1]) if row[1] else {}
+        metadata = json_loads(row[1]) if row[1] else {}
         created_at = row[2]
         
         # Generate report data
         report_data = {
-            'report_id': f"RPT_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            'report_id': f"RPT_{g.now.strftime('%Y%m%d%H%M%S')}",
             'session_id': session_id,
-            'generated_at': datetime.now().isoformat(),
+            'generated_at': g.now_iso,
             'symptom': metadata.get('symptom', 'Unknown'),
             'severity': metadata.get('severity', 'Unknown'),
             'age': metadata.get('age', 'Unknown'),
@@ -612,10 +1083,7 @@ def generate_report():
         }
         
         # Save report to database
-        cursor.execute('''
-            INSERT INTO reports (report_id, session_id, report_data, created_at)
-            VALUES (?, ?, ?, ?)
-        ''', (report_data['report_id'], session_id, json.dumps(report_data), datetime.now()))
+        cursor.execute(SQL_INSERT_REPORT, (report_data['report_id'], session_id, json_dumps(report_data), g.now))
         
         conn.commit()
         conn.close()
@@ -631,52 +1099,43 @@ def generate_report():
 
 @app.route('/api/reports/list', methods=['GET'])
 def list_reports():
-    """Get list of all reports"""
+    """Get list of all reports (newest first; optional ?limit=N)"""
     try:
         user_id = request.args.get('user_id', 'guest')
+        limit = request.args.get('limit', -1, type=int)  # SQLite treats a negative LIMIT as no limit
         
         conn = db.get_connection()
         cursor = conn.cursor()
         
-        # Check if reports table exists, create if not
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                report_id TEXT UNIQUE NOT NULL,
-                session_id TEXT NOT NULL,
-                report_data TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            SELECT report_id, report_data, created_at
+        # Pluck the list fields inside SQLite instead of parsing every report blob
+        cursor.arraysize = 256
+        cursor.execute(f'''
+            SELECT
+                report_id,
+                CASE WHEN json_type(report_data, '$.symptom') IS NULL THEN 'Unknown'
+                     ELSE json_extract(report_data, '$.symptom') END,
+                CASE WHEN json_type(report_data, '$.severity') IS NULL THEN 'Unknown'
+                     ELSE json_extract(report_data, '$.severity') END,
+                created_at,
+                json_extract(report_data, '$.session_id')
             FROM reports
+            WHERE CASE WHEN {SQL_REPORT_VALID} THEN json_type(report_data) END = 'object'
             ORDER BY created_at DESC
-        ''')
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        reports = []
-        for row in rows:
-            try:
-                report_data = json.loads(row[1])
-                reports.append({
-                    'report_id': row[0],
-                    'symptom': report_data.get('symptom', 'Unknown'),
-                    'severity': report_data.get('severity', 'Unknown'),
-                    'created_at': row[2],
-                    'session_id': report_data.get('session_id')
-                })
-            except:
-                continue
+            LIMIT ?
+        ''', (limit,))
+        
+        reports = (
+            {
+                'report_id': row[0],
+                'symptom': row[1],
+                'severity': row[2],
+                'created_at': row[3],
+                'session_id': row[4]
+            }
+            for row in cursor
+        )
         
-        return jsonify({
-            'success': True,
-            'reports': reports,
-            'count': len(reports)
-        }), 200
+        return stream_json_list('reports', reports, conn)
         
     except Exception as e:
         logger.error(f"Error listing reports: {str(e)}")
@@ -684,29 +1143,55 @@ def list_reports():
 
 @app.route('/api/reports/<report_id>', methods=['GET'])
 def get_report(report_id):
-    """Get a specific report"""
+    """Get a specific report (stored JSON text is validated by SQLite, then streamed as-is)"""
     try:
         conn = db.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT report_data
+            SELECT rowid, typeof(report_data), json_valid(report_data)
             FROM reports
             WHERE report_id = ?
         ''', (report_id,))
         
         row = cursor.fetchone()
-        conn.close()
         
         if not row:
+            conn.close()
             return jsonify({'error': 'Report not found'}), 404
         
-        report_data = json.loads(row[0])
+        rowid, stored_type, valid_json = row
         
-        return jsonify({
-            'success': True,
-            'report': report_data
-        }), 200
+        # Text rows are written by us but may predate validation or be edited
+        # by hand; never splice malformed JSON into the response
+        if stored_type == 'text' and not valid_json:
+            conn.close()
+            logger.error(f"Report {report_id} is not valid JSON")
+            return jsonify({'error': 'Stored report is corrupted'}), 500
+        
+        if stored_type != 'text' or not SQLITE_BLOB_IO:
+            # JSONB (or no blob API): let SQLite render the JSON text in one piece
+            cursor.execute('SELECT json(report_data) FROM reports WHERE rowid = ?', (rowid,))
+            report_json = cursor.fetchone()[0].encode('utf-8')
+            conn.close()
+            return Response(b'{"success": true, "report": ' + report_json + b'}', mimetype='application/json')
+        
+        def generate():
+            # Incremental blob I/O reads the stored text in fixed-size chunks
+            # instead of materializing the whole report
+            try:
+                yield b'{"success": true, "report": '
+                with conn.blobopen('reports', 'report_data', rowid, readonly=True) as blob:
+                    while True:
+                        chunk = blob.read(REPORT_READ_CHUNK)
+                        if not chunk:
+                            break
+                        yield chunk
+                yield b'}'
+            finally:
+                conn.close()
+        
+        return Response(stream_with_context(generate()), mimetype='application/json')
         
     except Exception as e:
         logger.error(f"Error fetching report: {str(e)}")
@@ -724,44 +1209,36 @@ def get_symptom_history():
         conn = db.get_connection()
         cursor = conn.cursor()
         
-        # Get symptom assessments from the last N days
+        # Get symptom assessments from the last N days (partial index on is_assessment);
+        # the dynamic flow stores its JSON metadata in severity_level
         cursor.execute('''
             SELECT 
-                created_at,
+                timestamp,
                 content,
-                metadata
+                severity_level
             FROM messages
-            WHERE session_id LIKE ? 
-            AND role = 'assistant'
-            AND content LIKE '%Assessment complete%'
-            AND datetime(created_at) >= datetime('now', '-' || ? || ' days')
-            ORDER BY created_at DESC
-        ''', (f'%session-%', days))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        symptoms = []
-        for row in rows:
-            try:
-                # Extract symptom info from content
-                content = row[1]
-                metadata = json.loads(row[2]) if row[2] else {}
-                
-                symptoms.append({
-                    'date': row[0],
-                    'symptom': metadata.get('symptom', 'Unknown'),
-                    'severity': metadata.get('severity', 'Unknown'),
-                    'content': content[:200]  # First 200 chars
-                })
-            except:
-                continue
+            WHERE is_assessment = 1
+            AND timestamp >= datetime('now', '-' || ? || ' days')
+            ORDER BY timestamp DESC
+        ''', (days,))
+        
+        def symptoms():
+            for row in cursor:
+                try:
+                    # Extract symptom info from content
+                    content = row[1]
+                    metadata = json_loads(row[2]) if row[2] else {}
+                    
+                    yield {
+                        'date': row[0],
+                        'symptom': metadata.get('symptom', 'Unknown'),
+                        'severity': metadata.get('severity', 'Unknown'),
+                        'content': content[:200]  # First 200 chars
+                    }
+                except:
+                    continue
         
-        return jsonify({
-            'success': True,
-            'symptoms': symptoms,
-            'count': len(symptoms)
-        }), 200
+        return stream_json_list('symptoms', symptoms(), conn)
         
     except Exception as e:
         logger.error(f"Error fetching symptom history: {str(e)}")
@@ -776,29 +1253,15 @@ def get_symptom_stats():
         conn = db.get_connection()
         cursor = conn.cursor()
         
-        # Get total consultations
+        # Consultations (30 / 7 days) and messages (30 days) in one round trip,
+        # each an index range scan
         cursor.execute('''
-            SELECT COUNT(DISTINCT session_id)
-            FROM sessions
-            WHERE created_at >= datetime('now', '-30 days')
+            SELECT
+                (SELECT COUNT(*) FROM sessions WHERE created_at >= datetime('now', '-30 days')),
+                (SELECT COUNT(*) FROM messages WHERE timestamp >= datetime('now', '-30 days')),
+                (SELECT COUNT(*) FROM sessions WHERE created_at >= datetime('now', '-7 days'))
         ''')
-        total_consultations = cursor.fetchone()[0]
-        
-        # Get total messages
-        cursor.execute('''
-            SELECT COUNT(*)
-            FROM messages
-            WHERE created_at >= datetime('now', '-30 days')
-        ''')
-        total_messages = cursor.fetchone()[0]
-        
-        # Get recent symptoms (last 7 days)
-        cursor.execute('''
-            SELECT COUNT(DISTINCT session_id)
-            FROM sessions
-            WHERE created_at >= datetime('now', '-7 days')
-        ''')
-        recent_consultations = cursor.fetchone()[0]
+        total_consultations, total_messages, recent_consultations = cursor.fetchone()
         
         conn.close()
         
@@ -837,7 +1300,7 @@ def start_dynamic_assessment():
         if not symptom_text:
             return jsonify({'error': 'Symptom text required'}), 400
         
-        logger.info(f"🚀 Starting dynamic assessment for: {symptom_text}")
+        logger.info("🚀 Starting dynamic assessment for: %s", symptom_text)
         
         # Start assessment with dynamic engine
         result = dynamic_engine.start_symptom_assessment(symptom_text)
@@ -845,7 +1308,7 @@ def start_dynamic_assessment():
         if result.get('status') == 'started':
             # Store session data
             session_memory = session_manager.get_memory(session_id)
-            session_memory['dynamic_assessment'] = result['session_data']
+            session_memory.dynamic_assessment = result['session_data']
             
             return jsonify({
                 'success': True,
@@ -859,7 +1322,7 @@ def start_dynamic_assessment():
             return jsonify({'error': result.get('message', 'Failed to start assessment')}), 500
             
     except Exception as e:
-        logger.error(f"❌ Error starting dynamic assessment: {str(e)}")
+        logger.error("❌ Error starting dynamic assessment: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/dynamic/answer', methods=['POST'])
@@ -880,23 +1343,25 @@ def answer_dynamic_question():
         if not answer:
             return jsonify({'error': 'Answer required'}), 400
         
-        # Get session data
-        session_memory = session_manager.get_memory(session_id)
-        session_data = session_memory.get('dynamic_assessment')
+        # Get session data (lookups never create a session for an unknown id)
+        session_memory = session_manager.find_memory(session_id)
+        session_data = session_memory.dynamic_assessment if session_memory is not None else None
         
         if not session_data:
             return jsonify({'error': 'No active assessment found. Please start a new assessment.'}), 400
         
-        logger.info(f"📝 Processing answer: {answer}")
+        logger.info("📝 Processing answer: %s", answer)
         
         # Process answer with dynamic engine
         result = dynamic_engine.process_answer(answer, session_data)
         
         # Update session data
         if 'session_data' in result:
-            session_memory['dynamic_assessment'] = result['session_data']
+            session_memory.dynamic_assessment = result['session_data']
+        
+        status = result.get('status')
         
-        if result.get('status') == 'continue':
+        if status == 'continue':
             # Return next question
             return jsonify({
                 'success': True,
@@ -907,60 +1372,42 @@ def answer_dynamic_question():
                 'session_id': session_id
             }), 200
             
-        elif result.get('status') == 'complete':
+        elif status == 'complete':
             # Assessment complete - return analysis
-            logger.info(f"✅ Assessment complete for: {result.get('symptom')}")
+            logger.info("✅ Assessment complete for: %s", result.get('symptom'))
             
             # Save to database with metadata
-            db.create_session(session_id)
-            metadata = json.dumps({
+            metadata = json_dumps({
                 'symptom': result.get('symptom'),
                 'severity': session_data.get('universal_answers', {}).get('severity', 'Unknown'),
                 'age': session_data.get('universal_answers', {}).get('age', 'Unknown')
             })
-            db.save_message(session_id, 'assistant', result['formatted_response'], None, metadata)
+            report_data = {
+                'report_id': f"RPT_{g.now.strftime('%Y%m%d%H%M%S')}",
+                'session_id': session_id,
+                'generated_at': g.now_iso,
+                'symptom': result.get('symptom'),
+                'severity': session_data.get('universal_answers', {}).get('severity', 'Unknown'),
+                'age': session_data.get('universal_answers', {}).get('age', 'Unknown'),
+                'analysis': result['formatted_response'],
+                'created_at': g.now_iso
+            }
             
-            # Auto-generate report
-            try:
-                report_data = {
-                    'report_id': f"RPT_{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                    'session_id': session_id,
-                    'generated_at': datetime.now().isoformat(),
-                    'symptom': result.get('symptom'),
-                    'severity': session_data.get('universal_answers', {}).get('severity', 'Unknown'),
-                    'age': session_data.get('universal_answers', {}).get('age', 'Unknown'),
-                    'analysis': result['formatted_response'],
-                    'created_at': datetime.now().isoformat()
-                }
-                
-                conn = db.get_connection()
-                cursor = conn.cursor()
-                
-                # Ensure reports table exists
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS reports (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        report_id TEXT UNIQUE NOT NULL,
-                        session_id TEXT NOT NULL,
-                        report_data TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                cursor.execute('''
-                    INSERT INTO reports (report_id, session_id, report_data, created_at)
-                    VALUES (?, ?, ?, ?)
-                ''', (report_data['report_id'], session_id, json.dumps(report_data), datetime.now()))
-                
-                conn.commit()
-                conn.close()
+            # Session, message and auto-generated report share one write transaction
+            with db.transaction(immediate=True) as cursor:
+                db.create_session(session_id)
+                db.save_message(session_id, 'assistant', result['formatted_response'], None, metadata, is_assessment=True)
                 
-                logger.info(f"✅ Auto-generated report: {report_data['report_id']}")
-            except Exception as e:
-                logger.error(f"❌ Error auto-generating report: {str(e)}")
+                # A failed statement only undoes itself, so a report error
+                # still lets the assessment message commit
+                try:
+                    cursor.execute(SQL_INSERT_REPORT, (report_data['report_id'], session_id, json_dumps(report_data), g.now))
+                    logger.info("✅ Auto-generated report: %s", report_data['report_id'])
+                except sqlite3.Error as e:
+                    logger.error("❌ Error auto-generating report: %s", e)
             
             # Clear session data
-            session_memory.pop('dynamic_assessment', None)
+            session_memory.dynamic_assessment = None
             
             return jsonify({
                 'success': True,
@@ -976,7 +1423,7 @@ def answer_dynamic_question():
             return jsonify({'error': result.get('message', 'Unknown error')}), 500
             
     except Exception as e:
-        logger.error(f"❌ Error processing answer: {str(e)}")
+        logger.error("❌ Error processing answer: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/dynamic/status', methods=['POST'])
@@ -988,8 +1435,8 @@ def get_dynamic_status():
         data = request.get_json()
         session_id = data.get('session_id', 'default-session')
         
-        session_memory = session_manager.get_memory(session_id)
-        session_data = session_memory.get('dynamic_assessment')
+        session_memory = session_manager.find_memory(session_id)
+        session_data = session_memory.dynamic_assessment if session_memory is not None else None
         
         if not session_data:
             return jsonify({
@@ -1006,7 +1453,7 @@ def get_dynamic_status():
         }), 200
         
     except Exception as e:
-        logger.error(f"❌ Error getting status: {str(e)}")
+        logger.error("❌ Error getting status: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # ========== Old Symptom Classifier Endpoints Removed - Now Using Dynamic Engine ==========
@@ -1014,6 +1461,9 @@ def get_dynamic_status():
 
 # ========== Simple Symptom Submit Endpoint (6-Step Headache Flow) ==========
 
+# Answers every submitted symptom flow must include
+SYMPTOM_SUBMIT_FIELDS = frozenset(('age_range', 'location', 'pain_group', 'taking_medicine', 'other_symptom'))
+
 @app.route('/symptom/submit', methods=['POST'])
 def submit_symptom():
     """Submit completed symptom flow and get recommendations"""
@@ -1021,10 +1471,9 @@ def submit_symptom():
         data = request.get_json()
         
         # Validate required fields
-        required_fields = ['age_range', 'location', 'pain_group', 'taking_medicine', 'other_symptom']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        missing = SYMPTOM_SUBMIT_FIELDS.difference(data)
+        if missing:
+            return jsonify({'error': f"Missing required fields: {', '.join(sorted(missing))}"}), 400
         
         # Validate conditional fields
         if data.get('taking_medicine') == 'Other' and not data.get('taking_medicine_other'):
@@ -1032,8 +1481,8 @@ def submit_symptom():
         if data.get('other_symptom') == 'Other' and not data.get('other_symptom_other'):
             return jsonify({'error': 'Please describe the other symptom'}), 400
         
-        # Import helper functions from simple_symptom_flow
-        from simple_symptom_flow import detect_possible_cause, build_home_remedies, recommend_medicine, build_warnings, SymptomRequest, AgeRange, PainGroup
+        if not SIMPLE_SYMPTOM_FLOW_AVAILABLE:
+            return jsonify({'error': 'Symptom flow is not available'}), 503
         
         # Create request object
         req = SymptomRequest(
@@ -1073,441 +1522,14 @@ def submit_symptom():
         return jsonify(summary), 200
         
     except Exception as e:
-        logger.error(f"Error submitting symptom: {str(e)}")
+        logger.error("Error submitting symptom: %s", e)
         return jsonify({'error': str(e)}), 500
 
-# Old /api/process endpoint - DEPRECATED (Now using /api/dynamic/* endpoints)
-# @app.route('/api/process', methods=['POST'])
-# def process_message():
-#     """Process incoming chat messages with AI and structured symptom intake"""
-    try:
-        # Support both JSON and form data
-        if request.is_json:
-            data = request.get_json()
-        else:
-            data = request.form
-            
-        message = data.get('message')
-        session_id = data.get('session_id', 'default-session')
-        
-        if not message:
-            return jsonify({'error': 'Message is required'}), 400
-        
-        # Check for emergencies first
-        from emergency_detection import detect_emergency
-        emergency_check = detect_emergency(message)
-        if emergency_check['is_emergency']:
-            db.create_session(session_id)
-            db.save_message(session_id, 'user', message, 'text', None)
-            db.save_message(session_id, 'assistant', emergency_check['message'], None, None)
-            return jsonify({
-                'response': emergency_check['message'],
-                'session_id': session_id,
-                'is_emergency': True
-            }), 200
-        
-        # Safety check
-        safety_check = check_safety(message)
-        if not safety_check['safe']:
-            db.create_session(session_id)
-            db.save_message(session_id, 'user', message, 'text', None)
-            db.save_message(session_id, 'assistant', safety_check['message'], None, None)
-            return jsonify({
-                'response': safety_check['message'],
-                'session_id': session_id,
-                'is_emergency': False
-            }), 200
-        
-        # Create session
-        db.create_session(session_id)
-        
-        # Try structured symptom classification first
-        from symptom_classifier import classify_symptom, format_symptom_summary, create_symptom_intake_response
-        
-        # Check if we're in the middle of a question flow
-        session_memory = session_manager.get_memory(session_id)
-        
-        if 'current_symptom' in session_memory and 'follow_up_questions' in session_memory:
-            # Continue existing question flow
-            question_index = session_memory.get('question_index', 0)
-            follow_up_questions = session_memory.get('follow_up_questions', [])
-            
-            # Store the answer
-            if question_index > 0:
-                if 'answers' not in session_memory:
-                    session_memory['answers'] = {}
-                prev_question = follow_up_questions[question_index - 1]
-                session_memory['answers'][prev_question] = message
-            
-            # Move to next question
-            if question_index < len(follow_up_questions):
-                current_question = follow_up_questions[question_index]
-                session_memory['question_index'] = question_index + 1
-                
-                # Determine appropriate options based on question type
-                options = []
-                q_lower = current_question.lower()
-                
-                # Standard questions
-                if 'age' in q_lower and 'your age' in q_lower:
-                    options = ['Under 18', '18-30', '31-45', '46-60', 'Over 60']
-                elif 'scale' in q_lower or ('severe' in q_lower and '1-10' in q_lower):
-                    options = ['1-3 (Mild)', '4-6 (Moderate)', '7-10 (Severe)']
-                elif 'medication' in q_lower or 'medicine' in q_lower:
-                    options = ['None', 'Paracetamol', 'Ibuprofen', 'Aspirin', 'Other']
-                elif 'other symptom' in q_lower:
-                    options = ['Fever', 'Fatigue', 'Body pain', 'Weakness', 'None', 'Other']
-                
-                # Headache-specific questions
-                elif 'where' in q_lower and 'located' in q_lower:
-                    options = ['Forehead', 'One side', 'Back of head', 'Top of head', 'All over']
-                elif 'how long' in q_lower:
-                    options = ['Less than 1 hour', '1-6 hours', '6-24 hours', '1-3 days', 'More than 3 days']
-                elif 'constant' in q_lower or 'comes and goes' in q_lower:
-                    options = ['Constant', 'Comes and goes', 'Pulsating/Throbbing']
-                elif 'nausea' in q_lower or 'vomiting' in q_lower:
-                    options = ['Yes, nausea', 'Yes, vomiting', 'Both', 'No']
-                elif 'sensitivity' in q_lower and ('light' in q_lower or 'sound' in q_lower):
-                    options = ['Light sensitivity', 'Sound sensitivity', 'Both', 'No']
-                elif 'dizziness' in q_lower or 'vision' in q_lower:
-                    options = ['Dizziness', 'Blurred vision', 'Both', 'No']
-                elif 'stress' in q_lower or 'sleep' in q_lower:
-                    options = ['Yes, stressed', 'Yes, lack of sleep', 'Both', 'No']
-                elif 'similar' in q_lower or 'before' in q_lower:
-                    options = ['Yes, frequently', 'Yes, occasionally', 'First time', 'Not sure']
-                
-                # Generic fallback
-                else:
-                    options = ['Yes', 'No', 'Not sure']
-                
-                response_text = f"Thank you. {current_question}"
-                
-                db.save_message(session_id, 'user', message, 'text', None)
-                db.save_message(session_id, 'assistant', response_text, None, None)
-                
-                return jsonify({
-                    'response': response_text,
-                    'session_id': session_id,
-                    'is_emergency': False,
-                    'symptom_detected': True,
-                    'question': {
-                        'text': current_question,
-                        'options': options,
-                        'question_number': question_index + 1,
-                        'total_questions': len(follow_up_questions)
-                    }
-                }), 200
-            else:
-                # All questions answered - generate medicine suggestions
-                symptom = session_memory.get('current_symptom', 'your symptoms')
-                answers = session_memory.get('answers', {})
-                
-                # Extract key information from answers
-                age = None
-                severity = None
-                current_meds = None
-                other_symptoms = []
-                
-                for question, answer in answers.items():
-                    if 'age' in question.lower():
-                        age = answer
-                    elif 'scale' in question.lower() or 'severe' in question.lower():
-                        severity = answer
-                    elif 'medication' in question.lower() or 'medicine' in question.lower():
-                        current_meds = answer
-                    elif 'other symptom' in question.lower():
-                        if answer not in ['None', 'No']:
-                            other_symptoms.append(answer)
-                
-                # Analyze answers to determine possible causes
-                possible_causes = []
-                home_remedies = []
-                medicine_suggestions = []
-                warnings = []
-                
-                if symptom == 'headache':
-                    # Determine possible causes based on answers
-                    location = None
-                    duration = None
-                    pattern = None
-                    has_nausea = False
-                    has_sensitivity = False
-                    has_stress = False
-                    
-                    for question, answer in answers.items():
-                        if 'located' in question.lower():
-                            location = answer
-                        elif 'how long' in question.lower():
-                            duration = answer
-                        elif 'constant' in question.lower():
-                            pattern = answer
-                        elif 'nausea' in question.lower():
-                            has_nausea = 'yes' in answer.lower() or 'nausea' in answer.lower()
-                        elif 'sensitivity' in question.lower():
-                            has_sensitivity = 'yes' in answer.lower() or 'sensitivity' in answer.lower()
-                        elif 'stress' in question.lower():
-                            has_stress = 'yes' in answer.lower() or 'stress' in answer.lower()
-                    
-                    # Determine possible causes
-                    if location and 'one side' in location.lower() and has_nausea and has_sensitivity:
-                        possible_causes.append("🔍 **Migraine** - One-sided headache with nausea and light sensitivity")
-                    elif has_stress or (pattern and 'constant' in pattern.lower()):
-                        possible_causes.append("🔍 **Tension Headache** - Often caused by stress, poor posture, or muscle tension")
-                    elif location and 'forehead' in location.lower():
-                        possible_causes.append("🔍 **Sinus Headache** - Pressure in forehead area, may be related to sinus congestion")
-                    else:
-                        possible_causes.append("🔍 **Primary Headache** - Common headache, likely tension-type or mild migraine")
-                    
-                    # Add home remedies
-                    home_remedies.append("🏠 **Rest** - Lie down in a quiet, dark room for 20-30 minutes")
-                    home_remedies.append("💧 **Hydration** - Drink 2-3 glasses of water slowly")
-                    home_remedies.append("❄️ **Cold Compress** - Apply ice pack wrapped in cloth to forehead for 15 minutes")
-                    home_remedies.append("☕ **Caffeine** - A small cup of coffee or tea may help (if not sensitive to caffeine)")
-                    home_remedies.append("🧘 **Relaxation** - Practice deep breathing or gentle neck stretches")
-                    home_remedies.append("🌿 **Peppermint Oil** - Apply diluted peppermint oil to temples (optional)")
-                    
-                    # Medicine suggestions based on severity
-                    if severity and '1-3' in severity:
-                        medicine_suggestions.append("💊 **Paracetamol 500mg** - Take 1 tablet every 6 hours (max 4 tablets/day)")
-                        medicine_suggestions.append("💊 **Alternative:** Aspirin 300mg - 1 tablet with water")
-                    elif severity and '4-6' in severity:
-                        medicine_suggestions.append("💊 **Paracetamol 500mg** - Take 1-2 tablets every 6 hours")
-                        medicine_suggestions.append("💊 **Ibuprofen 400mg** - Take 1 tablet with food (if no stomach issues)")
-                        medicine_suggestions.append("💊 **Combination:** Paracetamol + Caffeine (like Saridon) - 1 tablet")
-                    elif severity and '7-10' in severity:
-                        warnings.append("⚠️ **SEVERE HEADACHE** - Requires immediate medical attention")
-                        medicine_suggestions.append("💊 Take Paracetamol 500mg while arranging medical care")
-                        warnings.append("🚨 **EMERGENCY SIGNS:** Seek immediate help if you have:")
-                        warnings.append("   - Sudden severe headache (worst ever)")
-                        warnings.append("   - Confusion or difficulty speaking")
-                        warnings.append("   - Vision changes or loss")
-                        warnings.append("   - Neck stiffness with fever")
-                        warnings.append("   - Weakness or numbness")
-                    
-                    # Age-specific warnings
-                    if age and 'Over 60' in age:
-                        warnings.append("⚠️ **Age 60+:** Consult doctor before taking NSAIDs (Ibuprofen)")
-                        warnings.append("⚠️ New or severe headaches in older adults need medical evaluation")
-                    elif age and 'Under 18' in age:
-                        warnings.append("⚠️ **Under 18:** Use age-appropriate dosages, consult pharmacist")
-                    
-                    # Check for drug interactions
-                    if current_meds and current_meds not in ['None', 'No']:
-                        warnings.append(f"⚠️ **Drug Interaction Alert:** You're taking {current_meds}")
-                        warnings.append("   Check with pharmacist before taking additional medicines")
-                
-                # Build comprehensive response
-                response_parts = [
-                    f"Thank you for providing all the information about your {symptom}. Here's my analysis:",
-                    f"\n📋 **Your Information:**",
-                    f"- Age: {age or 'Not specified'}",
-                    f"- Severity: {severity or 'Not specified'}",
-                    f"- Current medications: {current_meds or 'None'}",
-                ]
-                
-                if other_symptoms:
-                    response_parts.append(f"- Other symptoms: {', '.join(other_symptoms)}")
-                
-                # Add possible causes
-                if possible_causes:
-                    response_parts.append(f"\n🔍 **Possible Causes:**")
-                    response_parts.extend(possible_causes)
-                
-                # Add home remedies
-                if home_remedies:
-                    response_parts.append(f"\n🏠 **Home Remedies (Try These First):**")
-                    response_parts.extend(home_remedies)
-                
-                # Add medicine suggestions
-                if medicine_suggestions:
-                    response_parts.append(f"\n💊 **Medicine Suggestions:**")
-                    response_parts.extend(medicine_suggestions)
-                
-                # Add warnings
-                if warnings:
-                    response_parts.append(f"\n⚠️ **Important Warnings:**")
-                    response_parts.extend(warnings)
-                
-                # Add general advice
-                response_parts.append(f"\n⚕️ **Medical Advice:**")
-                response_parts.append("- If headache persists beyond 24-48 hours, consult a doctor")
-                response_parts.append("- Keep a headache diary to track patterns and triggers")
-                response_parts.append("- Maintain regular sleep schedule and stay hydrated")
-                response_parts.append("- This is general information only - consult healthcare professional for personalized treatment")
-                
-                response_text = "\n".join(response_parts)
-                
-                # Clear the question flow
-                session_memory.pop('current_symptom', None)
-                session_memory.pop('follow_up_questions', None)
-                session_memory.pop('question_index', None)
-                
-                db.save_message(session_id, 'user', message, 'text', None)
-                db.save_message(session_id, 'assistant', response_text, None, None)
-                
-                return jsonify({
-                    'response': response_text,
-                    'session_id': session_id,
-                    'is_emergency': False,
-                    'symptom_detected': False,
-                    'summary': {
-                        'symptom': symptom,
-                        'age': age,
-                        'severity': severity,
-                        'current_medications': current_meds,
-                        'other_symptoms': other_symptoms,
-                        'possible_causes': possible_causes,
-                        'home_remedies': home_remedies,
-                        'medicine_suggestions': medicine_suggestions,
-                        'warnings': warnings
-                    }
-                }), 200
-        
-        # New symptom detection
-        classification = classify_symptom(message)
-        
-        # If symptom detected, start question flow
-        if classification.get('status') == 'success':
-            # Initialize question flow in session memory
-            session_manager.add_symptom(session_id, {
-                'symptom': classification['primary_symptom'],
-                'severity': classification['severity'],
-                'category': classification['category'],
-                'timestamp': datetime.now().isoformat()
-            })
-            
-            # Store question flow
-            follow_up_questions = classification.get('follow_up_questions', [])
-            session_memory['current_symptom'] = classification['primary_symptom']
-            session_memory['follow_up_questions'] = follow_up_questions
-            session_memory['question_index'] = 1  # Start at 1 since we're asking the first question now
-            session_memory['answers'] = {}
-            
-            # Get first question
-            if follow_up_questions:
-                first_question = follow_up_questions[0]
-                
-                # Determine appropriate options based on question type
-                options = []
-                q_lower = first_question.lower()
-                
-                # Standard questions
-                if 'age' in q_lower and 'your age' in q_lower:
-                    options = ['Under 18', '18-30', '31-45', '46-60', 'Over 60']
-                elif 'scale' in q_lower or ('severe' in q_lower and '1-10' in q_lower):
-                    options = ['1-3 (Mild)', '4-6 (Moderate)', '7-10 (Severe)']
-                elif 'medication' in q_lower or 'medicine' in q_lower:
-                    options = ['None', 'Paracetamol', 'Ibuprofen', 'Aspirin', 'Other']
-                elif 'other symptom' in q_lower:
-                    options = ['Fever', 'Fatigue', 'Body pain', 'Weakness', 'None', 'Other']
-                
-                # Headache-specific questions
-                elif 'where' in q_lower and 'located' in q_lower:
-                    options = ['Forehead', 'One side', 'Back of head', 'Top of head', 'All over']
-                elif 'how long' in q_lower:
-                    options = ['Less than 1 hour', '1-6 hours', '6-24 hours', '1-3 days', 'More than 3 days']
-                elif 'constant' in q_lower or 'comes and goes' in q_lower:
-                    options = ['Constant', 'Comes and goes', 'Pulsating/Throbbing']
-                elif 'nausea' in q_lower or 'vomiting' in q_lower:
-                    options = ['Yes, nausea', 'Yes, vomiting', 'Both', 'No']
-                elif 'sensitivity' in q_lower and ('light' in q_lower or 'sound' in q_lower):
-                    options = ['Light sensitivity', 'Sound sensitivity', 'Both', 'No']
-                elif 'dizziness' in q_lower or 'vision' in q_lower:
-                    options = ['Dizziness', 'Blurred vision', 'Both', 'No']
-                elif 'stress' in q_lower or 'sleep' in q_lower:
-                    options = ['Yes, stressed', 'Yes, lack of sleep', 'Both', 'No']
-                elif 'similar' in q_lower or 'before' in q_lower:
-                    options = ['Yes, frequently', 'Yes, occasionally', 'First time', 'Not sure']
-                
-                # Generic fallback
-                else:
-                    options = ['Yes', 'No', 'Not sure']
-                
-                response_text = f"I understand you're experiencing {classification['primary_symptom']}. Let me ask you a few questions to better understand your condition.\n\n{first_question}"
-            else:
-                response_text = f"I understand you're experiencing {classification['primary_symptom']}. Can you tell me more about it?"
-                options = []
-            
-            # Save messages
-            db.save_message(session_id, 'user', message, 'text', None)
-            db.save_message(session_id, 'assistant', response_text, None, None)
-            
-            return jsonify({
-                'response': response_text,
-                'session_id': session_id,
-                'is_emergency': False,
-                'symptom_detected': True,
-                'classification': classification,
-                'question': {
-                    'text': follow_up_questions[0] if follow_up_questions else None,
-                    'options': options,
-                    'question_number': 1,
-                    'total_questions': len(follow_up_questions)
-                }
-            }), 200
-        
-        # If no symptom detected, use regular AI chat
-        # Get system prompt and build context
-        system_prompt = get_system_prompt()
-        
-        # Get recent conversation history
-        history = db.get_session_history(session_id, limit=10)
-        
-        # Build conversation context
-        conversation_context = ""
-        for msg in history[-5:]:  # Last 5 messages
-            role = "Patient" if msg['role'] == 'user' else "MediChat"
-            conversation_context += f"{role}: {msg['content']}\n"
-        
-        # Add current message
-        conversation_context += f"Patient: {message}\n"
-        
-        # Combine system prompt with conversation
-        full_prompt = f"{system_prompt}\n\nCONVERSATION:\n{conversation_context}\n\nMediChat:"
-        
-        # Get AI response
-        from brain_of_the_doctor import analyze_image_with_query
-        ai_response = analyze_image_with_query(
-            query=message,
-            model="meta-llama/llama-4-scout-17b-16e-instruct",
-            encoded_image=None,
-            system_prompt=system_prompt
-        )
-        
-        # Save messages to database
-        db.save_message(session_id, 'user', message, 'text', None)
-        db.save_message(session_id, 'assistant', ai_response, None, None)
-        
-        # Return response
-        return jsonify({
-            'response': ai_response,
-            'session_id': session_id,
-            'is_emergency': False,
-            'symptom_detected': False
-        }), 200
-        
-    except Exception as e:
-        error_msg = f"Error processing message: {str(e)}"
-        logger.error(error_msg)
-        import traceback
-        trace = traceback.format_exc()
-        logger.error(trace)
-        
-        # Also write to file for debugging
-        try:
-            with open('error_log.txt', 'a') as f:
-                f.write(f"\n{'='*50}\n")
-                f.write(f"Time: {datetime.now()}\n")
-                f.write(f"Error: {error_msg}\n")
-                f.write(f"Traceback:\n{trace}\n")
-        except:
-            pass
-        
-        return jsonify({'error': 'Internal server error'}), 500
-
 print("✅ All feature module endpoints loaded successfully!")
 
 
 if __name__ == '__main__':
+    # Development server; use `gunicorn -c gunicorn_conf.py app:app` in production
+    start_warm_up()
     logger.info("Starting Flask server on port 5000...")
-    app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_ENV') == 'development', use_reloader=False, threaded=True)
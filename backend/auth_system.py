@@ -3,36 +3,112 @@ User Authentication System
 Handles user registration, login, and session management
 """
 import hashlib
+import hmac
+import itertools
 import secrets
 import sqlite3
 from typing import Optional, Dict, Tuple
 from datetime import datetime, timedelta
 from database import db
 
+# Stored hashes are tagged "pbkdf2_<algorithm>$<iterations>$<hex digest>" so
+# the PRF or work factor can change without re-hashing existing accounts.
+# SHA-256 stays the PRF: with SHA extensions (current x86/ARM) it runs about
+# 2x faster per iteration than SHA-512.
+PASSWORD_HASH_ALGORITHM = 'sha256'
+PASSWORD_HASH_ITERATIONS = 100000
+# 32-byte derived keys: one PRF block per iteration for either SHA-2 PRF
+PASSWORD_HASH_LENGTH = 32
+
+# Untagged hashes written before tagging was introduced
+LEGACY_HASH_ALGORITHM = 'sha256'
+LEGACY_HASH_ITERATIONS = 100000
+
+# Expired and logged-out sessions are purged once every this many
+# verify_session calls, so the sessions table doesn't grow without bound
+SESSION_PURGE_INTERVAL = 1000
+_session_verifications = itertools.count(1)
+
 class AuthenticationSystem:
     """Manages user authentication and sessions"""
     
+    # Login, session and password-change statements, shared as constants so
+    # every call hits the connection's prepared-statement cache
+    SQL_SELECT_CREDENTIALS = '''
+        SELECT user_id, password_hash, password_salt, is_active 
+        FROM user_credentials 
+        WHERE email = ?
+    '''
+    SQL_SELECT_ACTIVE_SESSION = '''
+        SELECT user_id 
+        FROM user_sessions 
+        WHERE session_token = ? AND is_active = 1 AND expires_at > ?
+    '''
+    SQL_PURGE_STALE_SESSIONS = '''
+        DELETE FROM user_sessions 
+        WHERE is_active = 0 OR expires_at <= ?
+    '''
+    SQL_INSERT_SESSION = '''
+        INSERT INTO user_sessions (session_token, user_id, expires_at, ip_address, user_agent)
+        VALUES (?, ?, ?, ?, ?)
+    '''
+    SQL_UPDATE_LAST_LOGIN = '''
+        UPDATE user_credentials 
+        SET last_login = CURRENT_TIMESTAMP 
+        WHERE user_id = ?
+    '''
+    SQL_UPDATE_PASSWORD = '''
+        UPDATE user_credentials 
+        SET password_hash = ?, password_salt = ? 
+        WHERE user_id = ?
+    '''
+    SQL_INVALIDATE_USER_SESSIONS = '''
+        UPDATE user_sessions 
+        SET is_active = 0 
+        WHERE user_id = ?
+    '''
+    
+    @staticmethod
+    def _pbkdf2(password: str, salt: str, algorithm: str, iterations: int) -> bytes:
+        """Raw PBKDF2-HMAC digest of a password"""
+        return hashlib.pbkdf2_hmac(
+            algorithm,
+            password.encode('utf-8'),
+            salt.encode('utf-8'),
+            iterations,
+            dklen=PASSWORD_HASH_LENGTH
+        )
+    
     @staticmethod
     def hash_password(password: str, salt: str = None) -> Tuple[str, str]:
-        """Hash password with salt"""
+        """Hash password with salt; returns (tagged hash, salt)"""
         if salt is None:
             salt = secrets.token_hex(16)
         
-        # Hash password with salt
-        password_hash = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt.encode('utf-8'),
-            100000  # iterations
-        ).hex()
+        digest = AuthenticationSystem._pbkdf2(password, salt, PASSWORD_HASH_ALGORITHM, PASSWORD_HASH_ITERATIONS).hex()
+        password_hash = f"pbkdf2_{PASSWORD_HASH_ALGORITHM}${PASSWORD_HASH_ITERATIONS}${digest}"
         
         return password_hash, salt
     
     @staticmethod
     def verify_password(password: str, password_hash: str, salt: str) -> bool:
-        """Verify password against hash"""
-        computed_hash, _ = AuthenticationSystem.hash_password(password, salt)
-        return computed_hash == password_hash
+        """Verify password against a tagged or legacy (untagged) hash"""
+        # A malformed tag, bad hex or unknown PRF fails verification
+        try:
+            if '$' in password_hash:
+                scheme, iterations, expected = password_hash.split('$', 2)
+                algorithm = scheme[len('pbkdf2_'):]
+                iterations = int(iterations)
+            else:
+                algorithm, iterations, expected = LEGACY_HASH_ALGORITHM, LEGACY_HASH_ITERATIONS, password_hash
+            
+            expected_digest = bytes.fromhex(expected)
+            computed_digest = AuthenticationSystem._pbkdf2(password, salt, algorithm, iterations)
+        except ValueError:
+            return False
+        
+        # Constant-time comparison of the raw digests
+        return hmac.compare_digest(computed_digest, expected_digest)
     
     @staticmethod
     def generate_session_token() -> str:
@@ -41,10 +117,17 @@ class AuthenticationSystem:
     
     @staticmethod
     def create_auth_tables():
-        """Create authentication tables"""
+        """Create authentication tables (skipped when the schema is already in place)"""
         conn = db.get_connection()
         cursor = conn.cursor()
         
+        # The user_id index is created last, so finding it means the tables
+        # and index all exist; databases from before the index still migrate
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_user_sessions_user_id'")
+        if cursor.fetchone():
+            conn.close()
+            return
+        
         # User credentials table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_credentials (
@@ -74,6 +157,9 @@ class AuthenticationSystem:
             )
         ''')
         
+        # Session invalidation (change_password) filters on user_id
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_sessions_user_id ON user_sessions(user_id)')
+        
         conn.commit()
         conn.close()
     
@@ -83,47 +169,51 @@ class AuthenticationSystem:
         Register new user
         Returns: (success, message, user_id)
         """
+        # Check if email already exists before paying for the hash
         conn = db.get_connection()
         cursor = conn.cursor()
+        cursor.execute('SELECT email FROM user_credentials WHERE email = ?', (email,))
+        registered = cursor.fetchone() is not None
+        conn.close()
+        if registered:
+            return False, "Email already registered", None
+        
+        # Hash before taking the write lock; PBKDF2 is the slow part
+        password_hash, salt = AuthenticationSystem.hash_password(password)
+        
+        # Generate user_id
+        user_id = f"U_{secrets.token_hex(8)}"
         
         try:
-            # Check if email already exists
-            cursor.execute('SELECT email FROM user_credentials WHERE email = ?', (email,))
-            if cursor.fetchone():
-                conn.close()
-                return False, "Email already registered", None
-            
-            # Generate user_id
-            user_id = f"U_{secrets.token_hex(8)}"
-            
-            # Hash password
-            password_hash, salt = AuthenticationSystem.hash_password(password)
-            
-            # Create user profile
-            success = db.create_user_profile(
-                user_id=user_id,
-                name=name,
-                email=email,
-                **profile_data
-            )
-            
-            if not success:
-                conn.close()
-                return False, "Failed to create profile", None
-            
-            # Store credentials
-            cursor.execute('''
-                INSERT INTO user_credentials (user_id, email, password_hash, password_salt)
-                VALUES (?, ?, ?, ?)
-            ''', (user_id, email, password_hash, salt))
-            
-            conn.commit()
-            conn.close()
+            # Profile and credentials are written in one transaction, so a
+            # failed credentials insert no longer leaves an orphan profile
+            with db.transaction(immediate=True) as cursor:
+                # Re-check under the write lock: a concurrent registration
+                # may have taken the email while we were hashing
+                cursor.execute('SELECT email FROM user_credentials WHERE email = ?', (email,))
+                if cursor.fetchone():
+                    return False, "Email already registered", None
+                
+                # Create user profile
+                success = db.create_user_profile(
+                    user_id=user_id,
+                    name=name,
+                    email=email,
+                    **profile_data
+                )
+                
+                if not success:
+                    return False, "Failed to create profile", None
+                
+                # Store credentials
+                cursor.execute('''
+                    INSERT INTO user_credentials (user_id, email, password_hash, password_salt)
+                    VALUES (?, ?, ?, ?)
+                ''', (user_id, email, password_hash, salt))
             
             return True, "Registration successful", user_id
             
         except Exception as e:
-            conn.close()
             return False, f"Registration failed: {str(e)}", None
     
     @staticmethod
@@ -137,11 +227,7 @@ class AuthenticationSystem:
         
         try:
             # Get user credentials
-            cursor.execute('''
-                SELECT user_id, password_hash, password_salt, is_active 
-                FROM user_credentials 
-                WHERE email = ?
-            ''', (email,))
+            cursor.execute(AuthenticationSystem.SQL_SELECT_CREDENTIALS, (email,))
             
             result = cursor.fetchone()
             
@@ -161,25 +247,21 @@ class AuthenticationSystem:
                 conn.close()
                 return False, "Invalid email or password", None, None
             
+            conn.close()
+            
             # Generate session token
             session_token = AuthenticationSystem.generate_session_token()
             expires_at = datetime.now() + timedelta(days=30)  # 30 days
             
-            # Create session
-            cursor.execute('''
-                INSERT INTO user_sessions (session_token, user_id, expires_at, ip_address, user_agent)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (session_token, user_id, expires_at, ip_address, user_agent))
-            
-            # Update last login
-            cursor.execute('''
-                UPDATE user_credentials 
-                SET last_login = CURRENT_TIMESTAMP 
-                WHERE user_id = ?
-            ''', (user_id,))
-            
-            conn.commit()
-            conn.close()
+            with db.transaction(immediate=True) as cursor:
+                # Create session
+                cursor.execute(
+                    AuthenticationSystem.SQL_INSERT_SESSION,
+                    (session_token, user_id, expires_at, ip_address, user_agent)
+                )
+                
+                # Update last login
+                cursor.execute(AuthenticationSystem.SQL_UPDATE_LAST_LOGIN, (user_id,))
             
             return True, "Login successful", user_id, session_token
             
@@ -196,30 +278,38 @@ class AuthenticationSystem:
         conn = db.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT user_id, expires_at, is_active 
-            FROM user_sessions 
-            WHERE session_token = ?
-        ''', (session_token,))
+        # expires_at is stored in sqlite3's default datetime format, so the
+        # expiry check is a plain string comparison against the same format
+        cursor.execute(
+            AuthenticationSystem.SQL_SELECT_ACTIVE_SESSION,
+            (session_token, datetime.now().isoformat(' '))
+        )
         
         result = cursor.fetchone()
         conn.close()
         
+        if next(_session_verifications) % SESSION_PURGE_INTERVAL == 0:
+            AuthenticationSystem.purge_stale_sessions()
+        
+        # Missing, inactive and expired sessions all come back empty
         if not result:
             return False, None
         
-        user_id, expires_at, is_active = result
+        return True, result[0]
+    
+    @staticmethod
+    def purge_stale_sessions() -> int:
+        """Delete expired and logged-out sessions; returns the number removed"""
+        conn = db.get_connection()
+        cursor = conn.cursor()
         
-        # Check if session is active
-        if not is_active:
-            return False, None
+        cursor.execute(AuthenticationSystem.SQL_PURGE_STALE_SESSIONS, (datetime.now().isoformat(' '),))
+        purged = cursor.rowcount
         
-        # Check if session expired
-        expires_at_dt = datetime.fromisoformat(expires_at)
-        if datetime.now() > expires_at_dt:
-            return False, None
+        conn.commit()
+        conn.close()
         
-        return True, user_id
+        return purged
     
     @staticmethod
     def logout_user(session_token: str) -> bool:
@@ -274,25 +364,17 @@ class AuthenticationSystem:
                 conn.close()
                 return False, "Incorrect current password"
             
+            conn.close()
+            
             # Hash new password
             new_hash, new_salt = AuthenticationSystem.hash_password(new_password)
             
-            # Update password
-            cursor.execute('''
-                UPDATE user_credentials 
-                SET password_hash = ?, password_salt = ? 
-                WHERE user_id = ?
-            ''', (new_hash, new_salt, user_id))
-            
-            # Invalidate all sessions
-            cursor.execute('''
-                UPDATE user_sessions 
-                SET is_active = 0 
-                WHERE user_id = ?
-            ''', (user_id,))
-            
-            conn.commit()
-            conn.close()
+            with db.transaction(immediate=True) as cursor:
+                # Update password
+                cursor.execute(AuthenticationSystem.SQL_UPDATE_PASSWORD, (new_hash, new_salt, user_id))
+                
+                # Invalidate all sessions
+                cursor.execute(AuthenticationSystem.SQL_INVALIDATE_USER_SESSIONS, (user_id,))
             
             return True, "Password changed successfully"
             
@@ -301,8 +383,5 @@ class AuthenticationSystem:
             return False, f"Failed to change password: {str(e)}"
 
 
-# Initialize auth system
+# Initialize auth system (tables are created by the app at startup, not on import)
 auth_system = AuthenticationSystem()
-
-# Create auth tables
-auth_system.create_auth_tables()
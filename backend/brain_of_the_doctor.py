@@ -9,16 +9,56 @@ GROQ_API_KEY=os.environ.get("GROQ_API_KEY")
 
 #Step2: Convert image to required format
 import base64
+import hashlib
+import threading
+from collections import OrderedDict
 
 
 #image_path="acne.jpg"
 
-def encode_image(image_path):   
-    image_file=open(image_path, "rb")
-    return base64.b64encode(image_file.read()).decode('utf-8')
+# Clients resend the same photo with follow-up questions, so keep the last
+# few encodings keyed by a hash of the image bytes
+ENCODED_IMAGE_CACHE_SIZE=16
+_encoded_images=OrderedDict()
+_encoded_images_lock=threading.Lock()
+
+# File signatures for the image types the vision model accepts
+IMAGE_SIGNATURES=((b"\x89PNG", "image/png"), (b"\xff\xd8", "image/jpeg"), (b"GIF8", "image/gif"), (b"RIFF", "image/webp"))
+
+def image_mime_type(raw):
+    return next((mime for signature, mime in IMAGE_SIGNATURES if raw.startswith(signature)), "image/jpeg")
+
+def encode_image(image_path, data_url=False):   
+    with open(image_path, "rb") as image_file:
+        return encode_image_bytes(image_file.read(), data_url)
+
+def encode_image_bytes(raw, data_url=False):
+    """
+    Encode raw image bytes, e.g. an upload's stream.read(), without a disk round-trip
+    
+    With data_url=True the complete "data:<mime>;base64,..." URL is returned
+    (and cached), so the multi-megabyte string is not rebuilt on every turn
+    that refers to the same photo.
+    """
+    key=(hashlib.blake2b(raw, digest_size=16).hexdigest(), data_url)
+    with _encoded_images_lock:
+        if key in _encoded_images:
+            _encoded_images.move_to_end(key)
+            return _encoded_images[key]
+    
+    # base64 output is pure ASCII, so skip UTF-8 decoding
+    encoded=base64.b64encode(raw).decode('ascii')
+    if data_url:
+        encoded=f"data:{image_mime_type(raw)};base64,{encoded}"
+    with _encoded_images_lock:
+        _encoded_images[key]=encoded
+        if len(_encoded_images) > ENCODED_IMAGE_CACHE_SIZE:
+            _encoded_images.popitem(last=False)
+    return encoded
 
 #Step3: Setup Multimodal LLM 
 from groq import Groq
+from http_client import http_client
 
 query="Is there something wrong with my face?"
 #model = "meta-llama/llama-4-maverick-17b-128e-instruct"
@@ -26,26 +66,43 @@ model="meta-llama/llama-4-scout-17b-16e-instruct"
 #model = "meta-llama/llama-4-scout-17b-16e-instruct"
 #model="llama-3.2-90b-vision-preview" #Deprecated
 
-def analyze_image_with_query(query, model, encoded_image=None, system_prompt=None):
+# One Groq client per process: building it re-reads the environment and
+# sets up the SDK's resources, so it is created on first use and shared
+_client=None
+_client_lock=threading.Lock()
+
+def _get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client=Groq(http_client=http_client)
+    return _client
+
+def image_url(encoded_image):
+    """Accept either a ready data URL or plain base64 (assumed JPEG)"""
+    if encoded_image.startswith("data:"):
+        return encoded_image
+    return f"data:image/jpeg;base64,{encoded_image}"
+
+def build_messages(query, encoded_image=None, system_prompt=None):
     """
-    Analyze image and/or text query using Groq's multimodal LLM
+    Build the chat messages sent to Groq's multimodal LLM
     
     Args:
         query: The user's question or the full prompt (if no system_prompt provided)
-        model: The model to use
-        encoded_image: Base64 encoded image (optional)
+        encoded_image: Base64 encoded image or data URL from encode_image(..., data_url=True) (optional)
         system_prompt: System instructions (optional, recommended for proper AI behavior)
     
     Returns:
-        AI response text
+        List of chat messages
     """
-    client=Groq()
-    
     # If system_prompt is provided, separate system and user messages
     # Otherwise, treat query as the full prompt (backward compatibility)
     if system_prompt:
-        # Extract user message from query (everything after system prompt)
-        user_message = query.replace(system_prompt, "").strip()
+        # query is only the user's message here; callers pass the system
+        # prompt separately rather than embedded in it
+        user_message = query
         
         # Build messages with proper system/user separation
         messages = [
@@ -65,7 +122,7 @@ def analyze_image_with_query(query, model, encoded_image=None, system_prompt=Non
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/jpeg;base64,{encoded_image}",
+                        "url": image_url(encoded_image),
                     },
                 },
             ]
@@ -87,17 +144,13 @@ def analyze_image_with_query(query, model, encoded_image=None, system_prompt=Non
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/jpeg;base64,{encoded_image}",
+                        "url": image_url(encoded_image),
                     },
                 },
             ]
         else:
-            content = [
-                {
-                    "type": "text", 
-                    "text": query
-                }
-            ]
+            # Text-only messages can be a plain string
+            content = query
         
         messages = [
             {
@@ -106,9 +159,48 @@ def analyze_image_with_query(query, model, encoded_image=None, system_prompt=Non
             }
         ]
     
+    return messages
+
+def analyze_image_with_query(query, model, encoded_image=None, system_prompt=None, messages=None):
+    """
+    Analyze image and/or text query using Groq's multimodal LLM
+    
+    Args:
+        query: The user's question or the full prompt (if no system_prompt provided)
+        model: The model to use
+        encoded_image: Base64 encoded image or data URL from encode_image(..., data_url=True) (optional)
+        system_prompt: System instructions (optional, recommended for proper AI behavior)
+        messages: Prebuilt chat messages (optional, overrides query/encoded_image/system_prompt).
+            Keep static instructions in a leading system message so the provider
+            can reuse the cached prompt prefix across requests
+    
+    Returns:
+        AI response text
+    """
+    client=_get_client()
+    
     chat_completion=client.chat.completions.create(
-        messages=messages,
+        messages=messages or build_messages(query, encoded_image, system_prompt),
         model=model
     )
 
     return chat_completion.choices[0].message.content
+
+def stream_image_with_query(query, model, encoded_image=None, system_prompt=None, messages=None):
+    """
+    Streaming variant of analyze_image_with_query
+    
+    Yields:
+        Response text fragments as the model decodes them
+    """
+    client=_get_client()
+    
+    stream=client.chat.completions.create(
+        messages=messages or build_messages(query, encoded_image, system_prompt),
+        model=model,
+        stream=True
+    )
+    
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
@@ -2,7 +2,7 @@
 Comprehensive Medical Question Generator
 Covers all 8 categories of medical information collection
 """
-from typing import List, Dict
+from typing import List, Dict, Optional
 from patient_profile import PatientProfile
 
 class ComprehensiveQuestionGenerator:
@@ -56,187 +56,68 @@ class ComprehensiveQuestionGenerator:
         'past_trauma': "Have you had any injuries or trauma related to this area?"
     }
     
-    @staticmethod
-    def generate_prioritized_questions(profile: PatientProfile) -> List[Dict[str, str]]:
-        """
-        Generate prioritized list of questions based on what's missing
-        Returns list of {category, question, priority}
-        """
-        questions = []
-        
+    # Missing-information questions as (profile attribute, category, field,
+    # question, priority, reason), listed in priority order
+    QUESTION_RULES = (
         # PRIORITY 1: Critical Basic Information (for medication safety)
-        if not profile.age:
-            questions.append({
-                'category': 'basic_info',
-                'field': 'age',
-                'question': ComprehensiveQuestionGenerator.BASIC_INFO_QUESTIONS['age'],
-                'priority': 1,
-                'reason': 'Critical for medication dosing'
-            })
-        
-        if not profile.gender:
-            questions.append({
-                'category': 'basic_info',
-                'field': 'gender',
-                'question': ComprehensiveQuestionGenerator.BASIC_INFO_QUESTIONS['gender'],
-                'priority': 1,
-                'reason': 'Important for diagnosis'
-            })
-        
+        ('age', 'basic_info', 'age', BASIC_INFO_QUESTIONS['age'], 1, 'Critical for medication dosing'),
+        ('gender', 'basic_info', 'gender', BASIC_INFO_QUESTIONS['gender'], 1, 'Important for diagnosis'),
         # PRIORITY 2: Primary Symptom Information
-        if not profile.primary_symptom:
-            questions.append({
-                'category': 'symptom',
-                'field': 'primary_symptom',
-                'question': ComprehensiveQuestionGenerator.SYMPTOM_QUESTIONS['primary_symptom'],
-                'priority': 2,
-                'reason': 'Essential for diagnosis'
-            })
-        
-        if not profile.severity_score:
-            questions.append({
-                'category': 'symptom',
-                'field': 'severity',
-                'question': ComprehensiveQuestionGenerator.SYMPTOM_QUESTIONS['severity'],
-                'priority': 2,
-                'reason': 'Determines urgency'
-            })
-        
-        if not profile.symptom_onset:
-            questions.append({
-                'category': 'symptom',
-                'field': 'onset',
-                'question': ComprehensiveQuestionGenerator.SYMPTOM_QUESTIONS['onset'],
-                'priority': 2,
-                'reason': 'Helps identify cause'
-            })
-        
+        ('primary_symptom', 'symptom', 'primary_symptom', SYMPTOM_QUESTIONS['primary_symptom'], 2, 'Essential for diagnosis'),
+        ('severity_score', 'symptom', 'severity', SYMPTOM_QUESTIONS['severity'], 2, 'Determines urgency'),
+        ('symptom_onset', 'symptom', 'onset', SYMPTOM_QUESTIONS['onset'], 2, 'Helps identify cause'),
         # PRIORITY 3: Medical History (for safety)
-        if not profile.chronic_conditions:
-            questions.append({
-                'category': 'basic_info',
-                'field': 'chronic_conditions',
-                'question': ComprehensiveQuestionGenerator.BASIC_INFO_QUESTIONS['chronic_conditions'],
-                'priority': 3,
-                'reason': 'Affects treatment options'
-            })
-        
-        if not profile.current_medications:
-            questions.append({
-                'category': 'basic_info',
-                'field': 'current_medications',
-                'question': ComprehensiveQuestionGenerator.BASIC_INFO_QUESTIONS['current_medications'],
-                'priority': 3,
-                'reason': 'Prevents drug interactions'
-            })
-        
-        if not profile.drug_allergies:
-            questions.append({
-                'category': 'basic_info',
-                'field': 'drug_allergies',
-                'question': ComprehensiveQuestionGenerator.BASIC_INFO_QUESTIONS['drug_allergies'],
-                'priority': 3,
-                'reason': 'Critical for safety'
-            })
-        
+        ('chronic_conditions', 'basic_info', 'chronic_conditions', BASIC_INFO_QUESTIONS['chronic_conditions'], 3, 'Affects treatment options'),
+        ('current_medications', 'basic_info', 'current_medications', BASIC_INFO_QUESTIONS['current_medications'], 3, 'Prevents drug interactions'),
+        ('drug_allergies', 'basic_info', 'drug_allergies', BASIC_INFO_QUESTIONS['drug_allergies'], 3, 'Critical for safety'),
         # PRIORITY 4: Detailed Symptom Characteristics
-        if not profile.symptom_location:
-            questions.append({
-                'category': 'symptom',
-                'field': 'location',
-                'question': ComprehensiveQuestionGenerator.SYMPTOM_QUESTIONS['location'],
-                'priority': 4,
-                'reason': 'Narrows diagnosis'
-            })
-        
-        if not profile.symptom_character:
-            questions.append({
-                'category': 'symptom',
-                'field': 'character',
-                'question': ComprehensiveQuestionGenerator.SYMPTOM_QUESTIONS['character'],
-                'priority': 4,
-                'reason': 'Identifies symptom type'
-            })
-        
-        if not profile.symptom_duration:
-            questions.append({
-                'category': 'symptom',
-                'field': 'duration',
-                'question': ComprehensiveQuestionGenerator.SYMPTOM_QUESTIONS['duration'],
-                'priority': 4,
-                'reason': 'Indicates acuity'
-            })
-        
+        ('symptom_location', 'symptom', 'location', SYMPTOM_QUESTIONS['location'], 4, 'Narrows diagnosis'),
+        ('symptom_character', 'symptom', 'character', SYMPTOM_QUESTIONS['character'], 4, 'Identifies symptom type'),
+        ('symptom_duration', 'symptom', 'duration', SYMPTOM_QUESTIONS['duration'], 4, 'Indicates acuity'),
         # PRIORITY 5: Symptom Modifiers
-        if not profile.aggravating_factors:
-            questions.append({
-                'category': 'symptom',
-                'field': 'aggravating',
-                'question': ComprehensiveQuestionGenerator.SYMPTOM_QUESTIONS['aggravating'],
-                'priority': 5,
-                'reason': 'Helps identify triggers'
-            })
-        
-        if not profile.relieving_factors:
-            questions.append({
-                'category': 'symptom',
-                'field': 'relieving',
-                'question': ComprehensiveQuestionGenerator.SYMPTOM_QUESTIONS['relieving'],
-                'priority': 5,
-                'reason': 'Guides treatment'
-            })
-        
-        if not profile.associated_symptoms:
-            questions.append({
-                'category': 'symptom',
-                'field': 'associated',
-                'question': ComprehensiveQuestionGenerator.SYMPTOM_QUESTIONS['associated'],
-                'priority': 5,
-                'reason': 'Identifies related conditions'
-            })
-        
+        ('aggravating_factors', 'symptom', 'aggravating', SYMPTOM_QUESTIONS['aggravating'], 5, 'Helps identify triggers'),
+        ('relieving_factors', 'symptom', 'relieving', SYMPTOM_QUESTIONS['relieving'], 5, 'Guides treatment'),
+        ('associated_symptoms', 'symptom', 'associated', SYMPTOM_QUESTIONS['associated'], 5, 'Identifies related conditions'),
         # PRIORITY 6: Pattern Recognition
-        if not profile.time_pattern:
-            questions.append({
-                'category': 'pattern',
-                'field': 'time_pattern',
-                'question': ComprehensiveQuestionGenerator.PATTERN_QUESTIONS['time_pattern'],
-                'priority': 6,
-                'reason': 'Identifies patterns'
-            })
-        
-        if not profile.progression:
-            questions.append({
-                'category': 'pattern',
-                'field': 'progression',
-                'question': ComprehensiveQuestionGenerator.PATTERN_QUESTIONS['progression'],
-                'priority': 6,
-                'reason': 'Tracks improvement'
-            })
-        
+        ('time_pattern', 'pattern', 'time_pattern', PATTERN_QUESTIONS['time_pattern'], 6, 'Identifies patterns'),
+        ('progression', 'pattern', 'progression', PATTERN_QUESTIONS['progression'], 6, 'Tracks improvement'),
         # PRIORITY 7: Risk Factors (for comprehensive assessment)
-        if profile.stress_level is None:
-            questions.append({
-                'category': 'risk_factor',
-                'field': 'stress',
-                'question': ComprehensiveQuestionGenerator.RISK_FACTOR_QUESTIONS['stress'],
-                'priority': 7,
-                'reason': 'Identifies contributing factors'
-            })
-        
+        ('stress_level', 'risk_factor', 'stress', RISK_FACTOR_QUESTIONS['stress'], 7, 'Identifies contributing factors'),
         # PRIORITY 8: Lifestyle Factors (lower priority)
-        if not profile.smoking_status:
-            questions.append({
-                'category': 'risk_factor',
-                'field': 'smoking',
-                'question': ComprehensiveQuestionGenerator.RISK_FACTOR_QUESTIONS['smoking'],
-                'priority': 8,
-                'reason': 'Risk factor assessment'
-            })
-        
-        # Sort by priority
-        questions.sort(key=lambda x: x['priority'])
+        ('smoking_status', 'risk_factor', 'smoking', RISK_FACTOR_QUESTIONS['smoking'], 8, 'Risk factor assessment'),
+    )
+    
+    # Attributes where a falsy value (a stress level of 0) is still an answer
+    NONE_MEANS_MISSING = frozenset({'stress_level'})
+    
+    @staticmethod
+    def generate_prioritized_questions(profile: PatientProfile, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Generate prioritized list of questions based on what's missing
+        Returns list of {category, question, priority}, at most limit long
+        """
+        questions = []
         
+        for attr, category, field, question, priority, reason in ComprehensiveQuestionGenerator.QUESTION_RULES:
+            value = getattr(profile, attr)
+            if attr in ComprehensiveQuestionGenerator.NONE_MEANS_MISSING:
+                missing = value is None
+            else:
+                missing = not value
+            
+            if missing:
+                questions.append({
+                    'category': category,
+                    'field': field,
+                    'question': question,
+                    'priority': priority,
+                    'reason': reason
+                })
+                # Rules run in priority order, so the first matches are the top ones
+                if len(questions) == limit:
+                    break
+        
+        # QUESTION_RULES is already in priority order, so no sort is needed
         return questions
     
     @staticmethod
@@ -245,29 +126,20 @@ class ComprehensiveQuestionGenerator:
         Generate a single combined question asking for multiple pieces of information
         Prioritizes most important missing information
         """
-        prioritized = ComprehensiveQuestionGenerator.generate_prioritized_questions(profile)
+        # Only the top N questions are needed
+        top_questions = ComprehensiveQuestionGenerator.generate_prioritized_questions(profile, limit=max_questions)
         
-        if not prioritized:
+        if not top_questions:
             return None
         
-        # Take top N questions
-        top_questions = prioritized[:max_questions]
-        
         # Build combined question
         if len(top_questions) == 1:
             return top_questions[0]['question']
         
-        # Combine multiple questions
-        question_parts = []
-        for i, q in enumerate(top_questions):
-            if i == 0:
-                question_parts.append(q['question'])
-            elif i == len(top_questions) - 1:
-                question_parts.append(f"and {q['question'].lower()}")
-            else:
-                question_parts.append(q['question'].lower())
-        
-        return ", ".join(question_parts[:-1]) + " " + question_parts[-1] if len(question_parts) > 1 else question_parts[0]
+        # Combine multiple questions: the first as written, the rest
+        # lowercased, the last one joined with "and"
+        head = ", ".join([top_questions[0]['question']] + [q['question'].lower() for q in top_questions[1:-1]])
+        return f"{head} and {top_questions[-1]['question'].lower()}"
     
     @staticmethod
     def get_information_summary(profile: PatientProfile) -> str:
@@ -285,7 +157,3 @@ class ComprehensiveQuestionGenerator:
         summary += f"Risk Level: {profile.get_risk_level()}\n"
         
         return summary
-
-
-# Initialize generator
-comprehensive_question_generator = ComprehensiveQuestionGenerator()
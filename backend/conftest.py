@@ -0,0 +1,22 @@
+"""
+pytest setup for the backend unit tests
+
+Several modules open `medichat.db` in the working directory when they are
+imported, so the test session runs from a scratch directory instead of
+touching the checked-in database.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp(prefix='medichat-tests-'))
+
+# Script-style checks that call the live Groq API or a running server
+collect_ignore = [
+    'test_api_call.py',
+    'test_dynamic_api.py',
+    'test_dynamic_direct.py',
+    'test_dynamic_engine.py',
+    'test_medicine_engine.py',
+]
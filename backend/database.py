@@ -2,18 +2,198 @@
 Database module for storing chat history, user sessions, and health metrics
 """
 import sqlite3
-import json
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import copy
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Any, Optional
+from response_cache import LRUCache
+
+# SQLite 3.45+ can store JSON as its binary JSONB encoding, which json_*()
+# functions read without re-parsing text; older builds keep JSON as TEXT
+JSONB_AVAILABLE = sqlite3.sqlite_version_info >= (3, 45, 0)
+
+class _PooledConnection:
+    """Per-thread connection handed out by get_connection(); close() keeps it open for reuse"""
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+    
+    def close(self):
+        # Discard uncommitted work, as closing a fresh connection would
+        if self._conn.in_transaction:
+            self._conn.rollback()
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+class _TransactionConnection(_PooledConnection):
+    """Connection handed out inside db.transaction(); commit/close are left to the transaction"""
+    
+    def commit(self):
+        pass
+    
+    def close(self):
+        pass
 
 class MediChatDatabase:
+    # Applied once to every new pooled connection
+    CONNECTION_PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=268435456",
+        # 64 MB page cache per connection (negative values are KiB)
+        "PRAGMA cache_size=-64000",
+    )
+    
+    # Per-message write statements, shared as constants so every call hits
+    # the connection's prepared-statement cache (cached_statements=256)
+    SQL_CREATE_SESSION = 'INSERT OR IGNORE INTO sessions (session_id) VALUES (?)'
+    SQL_SAVE_MESSAGE = '''
+        INSERT INTO messages (session_id, role, content, input_type, severity_level, is_assessment)
+        VALUES (?, ?, ?, ?, ?, ?)
+    '''
+    
+    # Session reads (history, memory) are served from memory for this many
+    # seconds; any write for the session drops its cached entry
+    READ_CACHE_TTL = 30
+    READ_CACHE_SIZE = 4096
+    # Idle connections kept open for reuse; extra ones are closed on release
+    POOL_SIZE = 8
+    
     def __init__(self, db_path: str = "medichat.db"):
         self.db_path = db_path
+        self._local = threading.local()
+        self._pool = queue.Queue(maxsize=self.POOL_SIZE)
+        self._read_cache = LRUCache(self.READ_CACHE_SIZE)  # session_id -> {part: result}
+        self._read_lock = threading.Lock()
+        self._write_epoch = 0
         self.init_database()
+        self.release_connection()
+    
+    def _cached_read(self, session_id: str, part: Any, load: Callable[[], Any]) -> Any:
+        """Return a cached per-session read result, loading it on a miss"""
+        transaction_conn = getattr(self._local, 'transaction_conn', None)
+        if transaction_conn is not None and transaction_conn.in_transaction:
+            # This connection holds uncommitted writes: read through, never cache
+            return load()
+        
+        with self._read_lock:
+            entry = self._read_cache.get(session_id)
+            if entry is not None and part in entry:
+                return entry[part]
+            epoch = self._write_epoch
+        
+        value = load()
+        
+        with self._read_lock:
+            # Skip storing if a write landed while loading; the result may predate it
+            if epoch == self._write_epoch:
+                entry = self._read_cache.get(session_id)
+                if entry is None:
+                    entry = {}
+                    self._read_cache.put(session_id, entry, ttl=self.READ_CACHE_TTL)
+                entry[part] = value
+        return value
+    
+    def invalidate_session(self, session_id: str):
+        """Drop cached reads for a session after writing to it"""
+        dirty_sessions = getattr(self._local, 'dirty_sessions', None)
+        if dirty_sessions is not None:
+            # Inside a transaction other threads can't see the write until
+            # COMMIT; transaction() invalidates once the commit has landed
+            dirty_sessions.add(session_id)
+            return
+        
+        with self._read_lock:
+            self._write_epoch += 1
+            self._read_cache.invalidate(session_id)
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a new SQLite connection with the shared pragmas applied"""
+        # Pooled connections move between threads, one thread at a time
+        conn = sqlite3.connect(self.db_path, cached_statements=256, check_same_thread=False)
+        for pragma in self.CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def _thread_connection(self) -> sqlite3.Connection:
+        """Return this thread's SQLite connection, checking one out of the pool on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = self._open_connection()
+            self._local.conn = conn
+        return conn
+    
+    def release_connection(self):
+        """
+        Hand this thread's connection back to the pool
+        
+        Called at the end of every Flask request: the threaded dev server
+        starts a new thread per request, so without this each request
+        would open (and set up) a fresh connection.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'transaction_conn', None) is not None:
+            return
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
     
     def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
+        """Get database connection (the open transaction's connection, if any)"""
+        transaction_conn = getattr(self._local, 'transaction_conn', None)
+        if transaction_conn is not None:
+            return _TransactionConnection(transaction_conn)
+        return _PooledConnection(self._thread_connection())
+    
+    @contextmanager
+    def transaction(self, immediate: bool = False):
+        """
+        Run several database calls on one connection with a single COMMIT
+        
+        Yields a cursor on the shared connection. With immediate=True the
+        write lock is taken up front (BEGIN IMMEDIATE) instead of on the
+        first write, so a writer never has to back off halfway through.
+        
+        Usage:
+            with db.transaction() as cursor:
+                db.save_message(...)
+                cursor.execute(...)
+        """
+        transaction_conn = getattr(self._local, 'transaction_conn', None)
+        if transaction_conn is not None:
+            # Nested: join the outer transaction
+            yield transaction_conn.cursor()
+            return
+        
+        conn = self._thread_connection()
+        self._local.transaction_conn = conn
+        self._local.dirty_sessions = dirty_sessions = set()
+        try:
+            if immediate and not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn.cursor()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._local.transaction_conn = None
+            self._local.dirty_sessions = None
+        
+        # Only after COMMIT: a reader that cached the old rows in the meantime
+        # is dropped here, and one still loading sees the epoch move
+        for session_id in dirty_sessions:
+            self.invalidate_session(session_id)
     
     def init_database(self):
         """Initialize database tables"""
@@ -39,10 +219,31 @@ class MediChatDatabase:
                 input_type TEXT,
                 severity_level TEXT,
                 timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                is_assessment INTEGER NOT NULL DEFAULT 0,
                 FOREIGN KEY (session_id) REFERENCES sessions(session_id)
             )
         ''')
         
+        # Older databases predate the is_assessment flag: add it and backfill
+        # from the content marker the history endpoint used to scan for
+        cursor.execute('PRAGMA table_info(messages)')
+        if 'is_assessment' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE messages ADD COLUMN is_assessment INTEGER NOT NULL DEFAULT 0')
+            cursor.execute('''
+                UPDATE messages SET is_assessment = 1
+                WHERE role = 'assistant' AND content LIKE '%Assessment complete%'
+            ''')
+        
+        # Dashboard history/stats scan recent rows only
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_created ON sessions(created_at DESC)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp DESC)')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_messages_assessment
+            ON messages(timestamp DESC) WHERE is_assessment = 1
+        ''')
+        # Per-session history reads filter on session_id, newest first
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, timestamp DESC)')
+        
         # Symptoms tracking table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS symptoms (
@@ -54,6 +255,7 @@ class MediChatDatabase:
                 FOREIGN KEY (session_id) REFERENCES sessions(session_id)
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_symptoms_session ON symptoms(session_id, reported_at DESC)')
         
         # Health metrics table
         cursor.execute('''
@@ -66,6 +268,7 @@ class MediChatDatabase:
                 FOREIGN KEY (session_id) REFERENCES sessions(session_id)
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_health_metrics_session ON health_metrics(session_id)')
         
         # ML metrics table
         cursor.execute('''
@@ -115,6 +318,11 @@ class MediChatDatabase:
                 FOREIGN KEY (user_id) REFERENCES user_profiles(user_id)
             )
         ''')
+        # Also serves the drug allergy check (user, type, case-insensitive name)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_user_allergies_user
+            ON user_allergies(user_id, allergy_type, allergy_name COLLATE NOCASE)
+        ''')
         
         # Chronic Conditions table
         cursor.execute('''
@@ -129,6 +337,7 @@ class MediChatDatabase:
                 FOREIGN KEY (user_id) REFERENCES user_profiles(user_id)
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_chronic_conditions_user ON user_chronic_conditions(user_id)')
         
         # Current Medications table
         cursor.execute('''
@@ -145,6 +354,7 @@ class MediChatDatabase:
                 FOREIGN KEY (user_id) REFERENCES user_profiles(user_id)
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_medications_user ON user_medications(user_id, is_active)')
         
         # Past Injuries table
         cursor.execute('''
@@ -160,6 +370,7 @@ class MediChatDatabase:
                 FOREIGN KEY (user_id) REFERENCES user_profiles(user_id)
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_injuries_user ON user_injuries(user_id)')
         
         # Medical History table
         cursor.execute('''
@@ -176,6 +387,7 @@ class MediChatDatabase:
                 FOREIGN KEY (user_id) REFERENCES user_profiles(user_id)
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_medical_history_user ON user_medical_history(user_id)')
         
         # Symptom History table (detailed tracking)
         cursor.execute('''
@@ -195,6 +407,7 @@ class MediChatDatabase:
                 FOREIGN KEY (user_id) REFERENCES user_profiles(user_id)
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_symptom_history_user ON user_symptom_history(user_id, symptom_date DESC)')
         
         # Doctor Notes table
         cursor.execute('''
@@ -209,6 +422,7 @@ class MediChatDatabase:
                 FOREIGN KEY (user_id) REFERENCES user_profiles(user_id)
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_doctor_notes_user ON doctor_notes(user_id, created_at DESC)')
         
         # Session Memory table (Module 9)
         cursor.execute('''
@@ -261,6 +475,18 @@ class MediChatDatabase:
             )
         ''')
         
+        # Generated assessment reports
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                report_id TEXT UNIQUE NOT NULL,
+                session_id TEXT NOT NULL,
+                report_data BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_created ON reports(created_at DESC)')
+        
         # Users table for authentication
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -293,27 +519,31 @@ class MediChatDatabase:
         """Create a new session"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute(
-            'INSERT OR IGNORE INTO sessions (session_id) VALUES (?)',
-            (session_id,)
-        )
+        cursor.execute(self.SQL_CREATE_SESSION, (session_id,))
         conn.commit()
         conn.close()
+        self.invalidate_session(session_id)
     
     def save_message(self, session_id: str, role: str, content: str, 
-                    input_type: str = None, severity_level: str = None):
-        """Save a chat message"""
+                    input_type: str = None, severity_level: str = None,
+                    is_assessment: bool = False):
+        """Save a chat message (is_assessment marks a completed symptom assessment)"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO messages (session_id, role, content, input_type, severity_level)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (session_id, role, content, input_type, severity_level))
+        cursor.execute(self.SQL_SAVE_MESSAGE, (session_id, role, content, input_type, severity_level, int(is_assessment)))
         conn.commit()
         conn.close()
+        self.invalidate_session(session_id)
     
     def get_session_history(self, session_id: str, limit: int = 20) -> List[Dict]:
         """Get chat history for a session"""
+        # Copy so callers can't modify the cached list
+        return list(self._cached_read(
+            session_id, ('history', limit),
+            lambda: self._load_session_history(session_id, limit)
+        ))
+    
+    def _load_session_history(self, session_id: str, limit: int) -> List[Dict]:
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
@@ -337,6 +567,14 @@ class MediChatDatabase:
         conn.close()
         return list(reversed(messages))
     
+    def get_session_bundle(self, session_id: str, history_limit: int = 10) -> Dict[str, Any]:
+        """Get chat history and session memory in one round-trip on a single connection"""
+        with self.transaction():
+            return {
+                'history': self.get_session_history(session_id, limit=history_limit),
+                'memory': self.get_session_memory(session_id)
+            }
+    
     def save_symptom(self, session_id: str, symptom_name: str, severity: str = None):
         """Save a symptom"""
         conn = self.get_connection()
@@ -347,6 +585,7 @@ class MediChatDatabase:
         ''', (session_id, symptom_name, severity))
         conn.commit()
         conn.close()
+        self.invalidate_session(session_id)
     
     def get_symptoms_history(self, session_id: str) -> List[Dict]:
         """Get symptom history for a session"""
@@ -472,6 +711,10 @@ class MediChatDatabase:
         Get comprehensive session memory including past symptoms, diagnoses, and medications
         This allows the bot to remember user's medical history within the session
         """
+        # Deep copy so callers can't modify the cached result
+        return copy.deepcopy(self._cached_read(session_id, 'memory', lambda: self._load_session_memory(session_id)))
+    
+    def _load_session_memory(self, session_id: str) -> Dict[str, Any]:
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -579,13 +822,17 @@ class MediChatDatabase:
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM user_profiles WHERE user_id = ?', (user_id,))
+        cursor.execute('''
+            SELECT user_id, name, age, gender, blood_group, weight_kg, height_cm, bmi,
+                   phone, email, emergency_contact, created_at, updated_at
+            FROM user_profiles WHERE user_id = ?
+        ''', (user_id,))
         row = cursor.fetchone()
-        
+
         if not row:
             conn.close()
             return None
-        
+
         profile = {
             'user_id': row[0],
             'name': row[1],
@@ -666,7 +913,7 @@ class MediChatDatabase:
             conn.close()
             return False
         
-        fields.append("last_updated = CURRENT_TIMESTAMP")
+        fields.append("updated_at = CURRENT_TIMESTAMP")
         values.append(user_id)
         
         query = f"UPDATE user_profiles SET {', '.join(fields)} WHERE user_id = ?"
@@ -677,36 +924,48 @@ class MediChatDatabase:
     
     def add_allergy(self, user_id: str, allergy_type: str, allergy_name: str, severity: str = None):
         """Add allergy to user profile"""
+        self.add_allergies(user_id, [(allergy_type, allergy_name, severity)])
+    
+    def add_allergies(self, user_id: str, allergies: List[tuple]):
+        """Add several (allergy_type, allergy_name, severity) allergies with one commit"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
+        cursor.executemany('''
             INSERT INTO user_allergies (user_id, allergy_type, allergy_name, severity)
             VALUES (?, ?, ?, ?)
-        ''', (user_id, allergy_type, allergy_name, severity))
+        ''', [(user_id, allergy_type, allergy_name, severity) for allergy_type, allergy_name, severity in allergies])
         conn.commit()
         conn.close()
     
     def add_chronic_condition(self, user_id: str, condition_name: str, diagnosed_date: str = None, 
                              severity: str = None, notes: str = None):
         """Add chronic condition to user profile"""
+        self.add_chronic_conditions(user_id, [(condition_name, diagnosed_date, severity, notes)])
+    
+    def add_chronic_conditions(self, user_id: str, conditions: List[tuple]):
+        """Add several (condition_name, diagnosed_date, severity, notes) conditions with one commit"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
+        cursor.executemany('''
             INSERT INTO user_chronic_conditions (user_id, condition_name, diagnosed_date, severity, notes)
             VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, condition_name, diagnosed_date, severity, notes))
+        ''', [(user_id, *condition) for condition in conditions])
         conn.commit()
         conn.close()
     
     def add_medication(self, user_id: str, medication_name: str, dosage: str = None, 
                       frequency: str = None, started_date: str = None, purpose: str = None):
         """Add current medication to user profile"""
+        self.add_medications(user_id, [(medication_name, dosage, frequency, started_date, purpose)])
+    
+    def add_medications(self, user_id: str, medications: List[tuple]):
+        """Add several (medication_name, dosage, frequency, started_date, purpose) medications with one commit"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
+        cursor.executemany('''
             INSERT INTO user_medications (user_id, medication_name, dosage, frequency, started_date, purpose)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, medication_name, dosage, frequency, started_date, purpose))
+        ''', [(user_id, *medication) for medication in medications])
         conn.commit()
         conn.close()
     
@@ -745,7 +1004,7 @@ class MediChatDatabase:
         cursor = conn.cursor()
         cursor.execute('''
             SELECT COUNT(*) FROM user_allergies 
-            WHERE user_id = ? AND allergy_type = 'drug' AND LOWER(allergy_name) = LOWER(?)
+            WHERE user_id = ? AND allergy_type = 'drug' AND allergy_name = ? COLLATE NOCASE
         ''', (user_id, medication_name))
         count = cursor.fetchone()[0]
         conn.close()
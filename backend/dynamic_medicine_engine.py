@@ -15,10 +15,46 @@ Clinical-grade medicine recommendations with hard safety rules + AI flexibility
 import json
 import os
 import logging
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Universal-question answer buckets, in the order they used to be tested.
+# Values: age -> (representative age, age group); severity -> 0-10 score
+AGE_BUCKETS = {
+    'Under 18': (15, 'child'),
+    '18-30': (25, 'adult'),
+    '31-45': (38, 'adult'),
+    '46-60': (53, 'adult'),
+    'Over 60': (65, 'adult'),
+}
+DEFAULT_AGE = (30, 'adult')
+
+SEVERITY_BUCKETS = {
+    '0-2': 2,
+    '3-6': 5,
+    '7-10': 8,
+}
+DEFAULT_SEVERITY = 5
+
+
+def match_answer_bucket(answer: Optional[str], buckets: Dict[str, Any], default: Any) -> Any:
+    """
+    Map a choice answer to its bucket value
+    
+    Answers are normally one of the option strings ('31-45', '7-10 (Severe)'),
+    found with one dict lookup on the whole answer or its first word;
+    free text falls back to the first bucket key it contains.
+    """
+    if not answer:
+        return default
+    value = buckets.get(answer)
+    if value is None:
+        value = buckets.get(answer.split(' ', 1)[0])
+    if value is None:
+        value = next((bucket_value for key, bucket_value in buckets.items() if key in answer), default)
+    return value
+
 class DynamicMedicineEngine:
     """
     ⭐ UPGRADED Clinical Decision-Making Engine
@@ -489,37 +525,11 @@ class DynamicMedicineEngine:
         Takes raw answers and converts to structured profile for safety checks.
         """
         try:
-            # Parse age
-            age_str = universal_answers.get('age', 'Unknown')
-            if 'Under 18' in age_str:
-                age = 15
-                age_group = 'child'
-            elif '18-30' in age_str:
-                age = 25
-                age_group = 'adult'
-            elif '31-45' in age_str:
-                age = 38
-                age_group = 'adult'
-            elif '46-60' in age_str:
-                age = 53
-                age_group = 'adult'
-            elif 'Over 60' in age_str:
-                age = 65
-                age_group = 'adult'
-            else:
-                age = 30
-                age_group = 'adult'
-            
-            # Parse severity
-            severity_str = universal_answers.get('severity', '3-6 (Moderate)')
-            if '0-2' in severity_str:
-                severity = 2
-            elif '3-6' in severity_str:
-                severity = 5
-            elif '7-10' in severity_str:
-                severity = 8
-            else:
-                severity = 5
+            # Parse age and severity (one bucket lookup each)
+            age, age_group = match_answer_bucket(universal_answers.get('age', 'Unknown'), AGE_BUCKETS, DEFAULT_AGE)
+            severity = match_answer_bucket(
+                universal_answers.get('severity', '3-6 (Moderate)'), SEVERITY_BUCKETS, DEFAULT_SEVERITY
+            )
             
             # Parse medications
             current_meds_str = universal_answers.get('current_medications', 'None')
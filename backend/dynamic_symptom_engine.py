@@ -26,6 +26,34 @@ class DynamicSymptomEngine:
     ✅ Proper medical reasoning with safety checks
     """
     
+    # Analysis report layout: fixed text with the patient info and the
+    # rendered sections filled in once per report
+    ANALYSIS_TEMPLATE = (
+        "# 📋 Medical Analysis: {symptom}\n\n"
+        "**Patient Information:**\n"
+        "• Age: {age}\n"
+        "• Severity: {severity}\n"
+        "• Current medications: {current_meds}\n\n"
+        "{sections}"
+        "---\n"
+        "## ⚠️ Medical Disclaimer:\n"
+        "This is AI-generated general medical information only. It is not a substitute for professional medical advice, diagnosis, or treatment. Always consult a qualified healthcare professional for personalized medical guidance."
+    )
+    
+    # (analysis key, heading, style) in report order; list sections are
+    # skipped when empty, text sections whenever the key is present
+    ANALYSIS_SECTIONS = (
+        ('possible_causes', "## 🔍 Possible Causes:", 'numbered'),
+        ('severity_assessment', "## ⚠️ Severity Assessment:", 'text'),
+        ('immediate_relief_steps', "## ⚡ Immediate Relief (Do This Now):", 'numbered'),
+        ('home_remedies', "## 🏠 Home Remedies:", 'numbered'),
+        ('recommended_medicines', "## 💊 Recommended Medicines:", 'numbered'),
+        ('red_flags', "## 🚨 SEEK IMMEDIATE MEDICAL HELP IF:", 'bullet'),
+        ('when_to_see_doctor', "## ⚕️ When to See a Doctor:", 'text'),
+        ('additional_advice', "## 💡 Additional Advice:", 'text'),
+        ('expected_recovery', "## ⏱️ Expected Recovery:", 'text'),
+    )
+    
     # 4 Universal Questions (work for EVERY symptom)
     UNIVERSAL_QUESTIONS = [
         {
@@ -62,6 +90,55 @@ class DynamicSymptomEngine:
         }
     ]
     
+    # Static instructions for the final analysis, sent as a leading system
+    # message so the provider can reuse the cached prompt prefix
+    ANALYSIS_INSTRUCTIONS = """You are an expert medical AI doctor. Analyze this patient's symptoms and provide comprehensive medical recommendations.
+
+YOUR TASK:
+Provide a complete medical analysis in JSON format with POSITIVE, ACTIONABLE language:
+
+{{
+  "possible_causes": [
+    "Most likely cause with clear, reassuring explanation",
+    "Alternative cause if applicable",
+    "Third possibility if relevant"
+  ],
+  "severity_assessment": "MILD/MODERATE/SEVERE with detailed reasoning and POSITIVE outlook",
+  "immediate_relief_steps": [
+    "Action you can take RIGHT NOW for relief (specific, immediate)",
+    "Second immediate action (within next hour)",
+    "Third action (within next 2-4 hours)"
+  ],
+  "home_remedies": [
+    "Specific remedy 1 with clear instructions and expected benefit",
+    "Specific remedy 2 with instructions",
+    "Specific remedy 3 with instructions"
+  ],
+  "recommended_medicines": [
+    "Medicine name (FDA-approved OTC) with SOURCE (e.g., 'Commonly prescribed by doctors'), exact dosage, timing, and age-appropriate safety info",
+    "Alternative medicine with dosage and source verification"
+  ],
+  "red_flags": [
+    "Warning sign 1 that requires SAME-DAY medical attention",
+    "Warning sign 2 that indicates emergency (call 911)"
+  ],
+  "when_to_see_doctor": "POSITIVE, CLEAR guidance: 'See a doctor TODAY if...' or 'Schedule appointment within 24-48 hours if...' (NO vague 'wait 3-5 days')",
+  "additional_advice": "Encouraging lifestyle tips and preventive measures",
+  "expected_recovery": "POSITIVE timeline: 'You should start feeling better within 24-48 hours' or 'Most people recover within 3-5 days with proper care' (NOT 'wait 1-2 weeks')"
+}}
+
+CRITICAL SAFETY & TRUST RULES:
+✅ MEDICINE VERIFICATION: Only recommend FDA-approved, commonly prescribed OTC medications
+✅ Include SOURCE: Mention "According to medical guidelines" or "Commonly prescribed by doctors for..."
+✅ AGE SAFETY: Consider patient's age (no aspirin for children under 16, adjust for elderly)
+✅ DRUG INTERACTIONS: Check current medications and warn about interactions
+✅ DOSAGE CLARITY: Be specific with dosages (e.g., "Paracetamol 500mg every 6 hours, max 4g/day for adults")
+✅ POSITIVE LANGUAGE: Use encouraging, actionable language - avoid negative phrases like "wait 3-5 days"
+✅ IMMEDIATE ACTIONS: Provide immediate relief steps, not just "wait and see"
+✅ CLEAR TIMELINE: Say "You should feel better within 24-48 hours" instead of "wait 1-2 weeks"
+✅ DOCTOR URGENCY: If severe, say "See a doctor TODAY" not "in 3-5 days"
+✅ Return ONLY valid JSON - no extra text"""
+    
     def __init__(self):
         self.model = "meta-llama/llama-4-scout-17b-16e-instruct"
         logger.info("✅ Dynamic Symptom Engine initialized - ready for ANY symptom")
@@ -353,10 +430,8 @@ Generate questions now (JSON only):"""
             
             logger.info(f"🎯 Generating AI analysis for: {symptom}")
             
-            # Build comprehensive prompt
-            prompt = f"""You are an expert medical AI doctor. Analyze this patient's symptoms and provide comprehensive medical recommendations.
-
-PATIENT CASE:
+            # Build the patient case; the static instructions go in the system message
+            prompt = f"""PATIENT CASE:
 Primary Symptom: {symptom}
 
 PATIENT INFORMATION:
@@ -369,62 +444,18 @@ SYMPTOM-SPECIFIC DETAILS:
 """
             
             # Add symptom-specific answers
-            for question_id, answer in symptom_answers.items():
-                prompt += f"- {question_id}: {answer}\n"
+            prompt += "".join(f"- {question_id}: {answer}\n" for question_id, answer in symptom_answers.items())
             
-            prompt += """
-YOUR TASK:
-Provide a complete medical analysis in JSON format with POSITIVE, ACTIONABLE language:
-
-{{
-  "possible_causes": [
-    "Most likely cause with clear, reassuring explanation",
-    "Alternative cause if applicable",
-    "Third possibility if relevant"
-  ],
-  "severity_assessment": "MILD/MODERATE/SEVERE with detailed reasoning and POSITIVE outlook",
-  "immediate_relief_steps": [
-    "Action you can take RIGHT NOW for relief (specific, immediate)",
-    "Second immediate action (within next hour)",
-    "Third action (within next 2-4 hours)"
-  ],
-  "home_remedies": [
-    "Specific remedy 1 with clear instructions and expected benefit",
-    "Specific remedy 2 with instructions",
-    "Specific remedy 3 with instructions"
-  ],
-  "recommended_medicines": [
-    "Medicine name (FDA-approved OTC) with SOURCE (e.g., 'Commonly prescribed by doctors'), exact dosage, timing, and age-appropriate safety info",
-    "Alternative medicine with dosage and source verification"
-  ],
-  "red_flags": [
-    "Warning sign 1 that requires SAME-DAY medical attention",
-    "Warning sign 2 that indicates emergency (call 911)"
-  ],
-  "when_to_see_doctor": "POSITIVE, CLEAR guidance: 'See a doctor TODAY if...' or 'Schedule appointment within 24-48 hours if...' (NO vague 'wait 3-5 days')",
-  "additional_advice": "Encouraging lifestyle tips and preventive measures",
-  "expected_recovery": "POSITIVE timeline: 'You should start feeling better within 24-48 hours' or 'Most people recover within 3-5 days with proper care' (NOT 'wait 1-2 weeks')"
-}}
-
-CRITICAL SAFETY & TRUST RULES:
-✅ MEDICINE VERIFICATION: Only recommend FDA-approved, commonly prescribed OTC medications
-✅ Include SOURCE: Mention "According to medical guidelines" or "Commonly prescribed by doctors for..."
-✅ AGE SAFETY: Consider patient's age (no aspirin for children under 16, adjust for elderly)
-✅ DRUG INTERACTIONS: Check current medications and warn about interactions
-✅ DOSAGE CLARITY: Be specific with dosages (e.g., "Paracetamol 500mg every 6 hours, max 4g/day for adults")
-✅ POSITIVE LANGUAGE: Use encouraging, actionable language - avoid negative phrases like "wait 3-5 days"
-✅ IMMEDIATE ACTIONS: Provide immediate relief steps, not just "wait and see"
-✅ CLEAR TIMELINE: Say "You should feel better within 24-48 hours" instead of "wait 1-2 weeks"
-✅ DOCTOR URGENCY: If severe, say "See a doctor TODAY" not "in 3-5 days"
-✅ Return ONLY valid JSON - no extra text
-
-Generate analysis now (JSON only):"""
+            prompt += "\nGenerate analysis now (JSON only):"
 
             # Get AI response
             ai_response = analyze_image_with_query(
-                query=prompt,
+                query=None,
                 model=self.model,
-                encoded_image=None
+                messages=[
+                    {"role": "system", "content": self.ANALYSIS_INSTRUCTIONS},
+                    {"role": "user", "content": prompt}
+                ]
             )
             
             logger.info(f"🤖 AI analysis received: {ai_response[:200]}...")
@@ -482,6 +513,15 @@ Generate analysis now (JSON only):"""
                 'message': f"Error generating analysis: {str(e)}"
             }
     
+    @staticmethod
+    def _format_section_body(value: Any, style: str) -> str:
+        """Render one report section: numbered list, bullet list, or plain text"""
+        if style == 'numbered':
+            return "\n".join(f"{i}. {item}" for i, item in enumerate(value, 1))
+        if style == 'bullet':
+            return "\n".join(f"• {item}" for item in value)
+        return f"{value}"
+    
     def _format_analysis(self, analysis: Dict, symptom: str, universal_answers: Dict) -> str:
         """
         📄 Format AI analysis into readable, professional medical report
@@ -491,79 +531,20 @@ Generate analysis now (JSON only):"""
             severity = universal_answers.get('severity', 'Unknown')
             current_meds = universal_answers.get('current_medications', 'None')
             
-            response_parts = [
-                f"# 📋 Medical Analysis: {symptom.title()}\n",
-                f"**Patient Information:**",
-                f"• Age: {age}",
-                f"• Severity: {severity}",
-                f"• Current medications: {current_meds}\n"
-            ]
-            
-            # Possible causes
-            if 'possible_causes' in analysis and analysis['possible_causes']:
-                response_parts.append("## 🔍 Possible Causes:")
-                for i, cause in enumerate(analysis['possible_causes'], 1):
-                    response_parts.append(f"{i}. {cause}")
-                response_parts.append("")
-            
-            # Severity assessment
-            if 'severity_assessment' in analysis:
-                response_parts.append(f"## ⚠️ Severity Assessment:")
-                response_parts.append(analysis['severity_assessment'])
-                response_parts.append("")
-            
-            # Immediate relief steps
-            if 'immediate_relief_steps' in analysis and analysis['immediate_relief_steps']:
-                response_parts.append("## ⚡ Immediate Relief (Do This Now):")
-                for i, step in enumerate(analysis['immediate_relief_steps'], 1):
-                    response_parts.append(f"{i}. {step}")
-                response_parts.append("")
-            
-            # Home remedies
-            if 'home_remedies' in analysis and analysis['home_remedies']:
-                response_parts.append("## 🏠 Home Remedies:")
-                for i, remedy in enumerate(analysis['home_remedies'], 1):
-                    response_parts.append(f"{i}. {remedy}")
-                response_parts.append("")
-            
-            # Medicines
-            if 'recommended_medicines' in analysis and analysis['recommended_medicines']:
-                response_parts.append("## 💊 Recommended Medicines:")
-                for i, med in enumerate(analysis['recommended_medicines'], 1):
-                    response_parts.append(f"{i}. {med}")
-                response_parts.append("")
-            
-            # Red flags
-            if 'red_flags' in analysis and analysis['red_flags']:
-                response_parts.append("## 🚨 SEEK IMMEDIATE MEDICAL HELP IF:")
-                for flag in analysis['red_flags']:
-                    response_parts.append(f"• {flag}")
-                response_parts.append("")
-            
-            # When to see doctor
-            if 'when_to_see_doctor' in analysis:
-                response_parts.append("## ⚕️ When to See a Doctor:")
-                response_parts.append(analysis['when_to_see_doctor'])
-                response_parts.append("")
-            
-            # Additional advice
-            if 'additional_advice' in analysis:
-                response_parts.append("## 💡 Additional Advice:")
-                response_parts.append(analysis['additional_advice'])
-                response_parts.append("")
-            
-            # Expected recovery
-            if 'expected_recovery' in analysis:
-                response_parts.append("## ⏱️ Expected Recovery:")
-                response_parts.append(analysis['expected_recovery'])
-                response_parts.append("")
-            
-            # Disclaimer
-            response_parts.append("---")
-            response_parts.append("## ⚠️ Medical Disclaimer:")
-            response_parts.append("This is AI-generated general medical information only. It is not a substitute for professional medical advice, diagnosis, or treatment. Always consult a qualified healthcare professional for personalized medical guidance.")
+            # One block per present section, then a single format call
+            sections = "".join(
+                f"{header}\n{self._format_section_body(analysis[key], style)}\n\n"
+                for key, header, style in self.ANALYSIS_SECTIONS
+                if key in analysis and (style == 'text' or analysis[key])
+            )
             
-            return "\n".join(response_parts)
+            return self.ANALYSIS_TEMPLATE.format(
+                symptom=symptom.title(),
+                age=age,
+                severity=severity,
+                current_meds=current_meds,
+                sections=sections
+            )
             
         except Exception as e:
             logger.error(f"❌ Error formatting analysis: {str(e)}")
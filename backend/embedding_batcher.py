@@ -0,0 +1,58 @@
+"""
+Embedding Request Batcher
+Collects concurrent query encodes for a few milliseconds and runs them
+through the SentenceTransformer as one length-sorted batch, so parallel
+requests share a single forward pass instead of each encoding batch=1
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """Background thread that batches encode() calls for one embedder"""
+
+    def __init__(self, embedder: Any, max_batch_size: int = 32, max_wait: float = 0.005):
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def encode(self, text: str, timeout: float = 30.0):
+        """Queue a text for the next batch and wait for its embedding"""
+        future = Future()
+        self._queue.put((text, future))
+        return future.result(timeout=timeout)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the window closes"""
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Similar lengths pad to similar sizes, so sort before encoding
+            batch.sort(key=lambda item: len(item[0]))
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = self.embedder.encode(texts, batch_size=self.max_batch_size)
+            except Exception as e:
+                logger.error(f"Batched embedding failed: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
@@ -2,6 +2,7 @@
 Emergency Detection System
 Detects life-threatening situations and provides immediate guidance
 """
+from keyword_scanner import KeywordScanner
 
 EMERGENCY_KEYWORDS = [
     'chest pain', 'can\'t breathe', 'cannot breathe', 'severe bleeding', 'unconscious',
@@ -11,6 +12,14 @@ EMERGENCY_KEYWORDS = [
     'slurred speech', 'confusion', 'severe headache', 'vision loss', 'paralysis'
 ]
 
+EMERGENCY_PHRASES = (
+    'want to die', 'end my life', 'hurt myself',
+    'severe pain', 'can\'t move', 'losing consciousness'
+)
+
+# Keywords and phrases checked together in one pass
+EMERGENCY_SCANNER = KeywordScanner(EMERGENCY_KEYWORDS + list(EMERGENCY_PHRASES))
+
 EMERGENCY_RESPONSE = {
     'is_emergency': True,
     'message': '🚨 EMERGENCY: This may be a medical emergency. Please call 911 or go to the nearest emergency room immediately. Do not wait.',
@@ -31,22 +40,9 @@ def detect_emergency(message):
     if not message:
         return {'is_emergency': False}
     
-    message_lower = message.lower()
-    
-    # Check for emergency keywords
-    for keyword in EMERGENCY_KEYWORDS:
-        if keyword in message_lower:
-            return EMERGENCY_RESPONSE
-    
-    # Check for emergency phrases
-    emergency_phrases = [
-        'want to die', 'end my life', 'hurt myself',
-        'severe pain', 'can\'t move', 'losing consciousness'
-    ]
-    
-    for phrase in emergency_phrases:
-        if phrase in message_lower:
-            return EMERGENCY_RESPONSE
+    # Check for emergency keywords and phrases
+    if EMERGENCY_SCANNER.search(message):
+        return EMERGENCY_RESPONSE
     
     return {'is_emergency': False}
 
@@ -0,0 +1,28 @@
+"""
+Gunicorn configuration for serving the Flask backend in production
+
+    cd backend
+    gunicorn -c gunicorn_conf.py app:app
+
+Most request time is spent waiting on Groq/ElevenLabs, so threads give the
+concurrency; each in-flight request holds one thread.
+"""
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Session memory and question flows live in process memory, so keep a
+# single worker unless REDIS_URL-backed sessions are in use
+workers = int(os.environ.get("GUNICORN_WORKERS", 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+worker_class = "gthread"
+
+# Voice answers stream audio for a while; leave room beyond one LLM call
+timeout = 120
+keepalive = 5
+
+
+def post_worker_init(worker):
+    """Open provider connections in each worker before it takes traffic"""
+    from http_client import start_warm_up
+    start_warm_up()
@@ -0,0 +1,43 @@
+"""
+Shared HTTP Connection Pool
+Keep-alive httpx clients reused by the Groq and ElevenLabs SDK clients so
+consecutive API calls skip the TCP + TLS handshake
+"""
+import logging
+import threading
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Idle connections are kept for a minute (httpx defaults to 5s) so a pool
+# warmed at startup is still open for the first real request
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+
+# Sync pool for the Flask app and helper modules
+http_client = httpx.Client(limits=HTTP_LIMITS, timeout=httpx.Timeout(60.0, connect=10.0))
+
+# Async pool for the FastAPI streaming server
+async_http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=httpx.Timeout(60.0, connect=10.0))
+
+# Provider hosts used by the SDK clients
+WARMUP_URLS = ["https://api.groq.com", "https://api.elevenlabs.io"]
+
+def warm_up_connections():
+    """Open pooled connections to each provider so the first request skips DNS + TLS setup"""
+    for url in WARMUP_URLS:
+        try:
+            http_client.head(url)
+        except httpx.HTTPError as e:
+            logger.warning(f"Connection warm-up failed for {url}: {str(e)}")
+
+def start_warm_up():
+    """Warm up in the background so the server binds immediately"""
+    threading.Thread(target=warm_up_connections, daemon=True).start()
+
+async def async_warm_up_connections():
+    """Async variant for the FastAPI streaming server"""
+    for url in WARMUP_URLS:
+        try:
+            await async_http_client.head(url)
+        except httpx.HTTPError as e:
+            logger.warning(f"Connection warm-up failed for {url}: {str(e)}")
@@ -0,0 +1,75 @@
+"""
+Multi-Keyword Scanner
+Finds which of a fixed set of keywords occur in a text in a single pass,
+replacing `for keyword in KEYWORDS: if keyword in text` loops.
+Uses a pyahocorasick automaton when the package is installed, otherwise
+one precompiled regex alternation.
+"""
+import re
+from typing import Iterable, Optional, Set
+
+# Optional Aho-Corasick automaton: one linear pass however many keywords,
+# where the regex alternation retries every keyword at each position
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Backends in order of preference
+BACKENDS = ('ahocorasick', 'regex') if AHOCORASICK_AVAILABLE else ('regex',)
+
+
+class KeywordScanner:
+    """Case-insensitive substring scan for a fixed keyword set"""
+
+    def __init__(self, keywords: Iterable[str], backend: Optional[str] = None):
+        # Deduplicated, lowercase, longest first so the regex alternation
+        # reports the longest keyword starting at each position
+        self.keywords = sorted({keyword.lower() for keyword in keywords}, key=len, reverse=True)
+        if backend is None:
+            backend = BACKENDS[0]
+        if backend not in BACKENDS:
+            raise ValueError(f"Keyword scanner backend not available: {backend}")
+        self._automaton = None
+
+        if backend == 'ahocorasick' and self.keywords:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+
+        # The lookahead reports overlapping keywords ('severe headache' also
+        # yields 'headache'); keywords sharing a start position with a longer
+        # match are recovered through the prefix table
+        self._pattern = re.compile('(?=({}))'.format('|'.join(re.escape(keyword) for keyword in self.keywords)))
+        self._prefixes = {
+            keyword: [other for other in self.keywords if other != keyword and keyword.startswith(other)]
+            for keyword in self.keywords
+        }
+
+    def scan(self, text: str) -> Set[str]:
+        """Return every keyword that occurs in the text"""
+        if not text:
+            return set()
+        text_lower = text.lower()
+
+        if self._automaton is not None:
+            # The automaton reports overlapping matches itself
+            return {keyword for _, keyword in self._automaton.iter(text_lower)}
+
+        hits = {match.group(1) for match in self._pattern.finditer(text_lower)}
+        for keyword in list(hits):
+            hits.update(self._prefixes[keyword])
+        return hits
+
+    def search(self, text: str) -> bool:
+        """Return True as soon as any keyword occurs in the text"""
+        if not text:
+            return False
+        text_lower = text.lower()
+
+        if self._automaton is not None:
+            return next(self._automaton.iter(text_lower), None) is not None
+
+        return self._pattern.search(text_lower) is not None
@@ -0,0 +1,45 @@
+"""
+Deferred Imports
+Heavy optional dependencies (sentence-transformers/torch, faiss, sklearn)
+take seconds to import. lazy_import() only checks that a package is
+installed and returns a stand-in that imports the real module on first
+attribute access, so app start-up doesn't pay for models that load later
+in a background thread.
+"""
+import importlib
+import importlib.util
+from typing import Any
+
+
+class LazyModule:
+    """Module stand-in; the real import runs on first attribute access"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str) -> Any:
+        if self._module is None:
+            # import_module takes the per-module import lock, so concurrent
+            # first accesses from several threads import only once
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Return a lazily imported module
+
+    Raises ImportError right away if the top-level package is not
+    installed, so callers keep the usual try/except ImportError pattern.
+    """
+    # Only the top-level package is looked up: finding a submodule's spec
+    # would import its parent package eagerly
+    package = name.partition('.')[0]
+    if importlib.util.find_spec(package) is None:
+        raise ImportError(f"No module named '{package}'")
+    return LazyModule(name)
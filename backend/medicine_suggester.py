@@ -3,14 +3,23 @@ Medicine Name Suggestions System
 Displays safe OTC medicine names without prescriptive advice
 """
 
+import re
 from typing import Dict, List, Optional
 
+AGE_LIMIT_RE = re.compile(r'under (\d+)')
+
+ADDITIONAL_ADVICE = 'Always read the label and follow instructions. When in doubt, ask a pharmacist or doctor.'
+
 
 class MedicineSuggester:
     """Suggests safe OTC medicines with appropriate disclaimers"""
     
     def __init__(self):
         self.otc_medicines = self.load_otc_medicines()
+        # Freeze each category's medicines so unfiltered suggestions can
+        # hand out the same tuple on every request
+        for category_data in self.otc_medicines.values():
+            category_data['medicines'] = tuple(category_data['medicines'])
         self.disclaimer = "⚠️ **IMPORTANT:** This is educational information only. Consult a doctor or pharmacist before using any medication."
     
     def load_otc_medicines(self) -> Dict:
@@ -169,24 +178,22 @@ class MedicineSuggester:
                 'disclaimer': self.disclaimer
             }
         
-        # Filter medicines based on age and allergies
-        suitable_medicines = []
-        for medicine in category_data['medicines']:
-            # Check age restrictions
-            if user_age and not self.check_age_appropriate(medicine, user_age):
-                continue
-            
-            # Check allergies
-            if user_allergies and self.check_allergy_conflict(medicine, user_allergies):
-                continue
-            
-            suitable_medicines.append(medicine)
+        if not user_age and not user_allergies:
+            # Nothing to filter on: share the category's prebuilt tuple
+            suitable_medicines = category_data['medicines']
+        else:
+            # Filter medicines based on age and allergies
+            suitable_medicines = tuple(
+                medicine for medicine in category_data['medicines']
+                if not (user_age and not self.check_age_appropriate(medicine, user_age))
+                and not (user_allergies and self.check_allergy_conflict(medicine, user_allergies))
+            )
         
         return {
             'category': category_data['category'],
             'medicines': suitable_medicines,
             'disclaimer': self.disclaimer,
-            'additional_advice': 'Always read the label and follow instructions. When in doubt, ask a pharmacist or doctor.'
+            'additional_advice': ADDITIONAL_ADVICE
         }
     
     def check_age_appropriate(self, medicine: Dict, age: int) -> bool:
@@ -195,8 +202,7 @@ class MedicineSuggester:
         
         if 'not for children under' in restrictions:
             # Extract age limit
-            import re
-            match = re.search(r'under (\d+)', restrictions)
+            match = AGE_LIMIT_RE.search(restrictions)
             if match:
                 min_age = int(match.group(1))
                 return age >= min_age
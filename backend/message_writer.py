@@ -0,0 +1,85 @@
+"""
+Background Message Writer
+Queues chat message inserts and writes them from one thread, committing
+everything that arrived within a short window as a single transaction,
+so chat responses never wait on a SQLite commit
+"""
+import atexit
+import logging
+import queue
+import threading
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriter:
+    """Background thread that batches save_message() calls for one database"""
+
+    def __init__(self, db: Any, max_batch_size: int = 100, max_wait: float = 0.05):
+        self.db = db
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+        self._thread.start()
+        # Daemon threads are killed at exit; write out what is still queued
+        atexit.register(self.flush)
+
+    def save_message(self, session_id: str, role: str, content: str,
+                     input_type: str = None, severity_level: str = None,
+                     create_session: bool = False):
+        """Queue a chat message (and optionally its session row) for the next batch"""
+        self._queue.put((session_id, role, content, input_type, severity_level, create_session))
+
+    def flush(self):
+        """Block until every queued message has been committed"""
+        self._queue.join()
+
+    def _collect(self):
+        """Block for the first message, then gather more until the batch is full or the window closes"""
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        with self.db.transaction(immediate=True) as cursor:
+            for session_id, _, _, _, _, create_session in batch:
+                if create_session:
+                    cursor.execute(self.db.SQL_CREATE_SESSION, (session_id,))
+            cursor.executemany(self.db.SQL_SAVE_MESSAGE, [
+                (session_id, role, content, input_type, severity_level, 0)
+                for session_id, role, content, input_type, severity_level, _ in batch
+            ])
+
+    def _write_each(self, batch):
+        """Retry a failed batch one message per transaction so only bad rows are lost"""
+        for item in batch:
+            try:
+                self._write([item])
+            except Exception as e:
+                session_id, role = item[0], item[1]
+                logger.error(f"Dropped queued {role} message for session {session_id}: {str(e)}")
+    
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._write(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    logger.error(f"Dropped queued {batch[0][1]} message for session {batch[0][0]}: {str(e)}")
+                else:
+                    logger.error(f"Failed to write {len(batch)} queued messages, retrying one at a time: {str(e)}")
+                    self._write_each(batch)
+            finally:
+                # Hand the connection back so the pool isn't pinned by this thread
+                self.db.release_connection()
+                for session_id in {item[0] for item in batch}:
+                    self.db.invalidate_session(session_id)
+                for _ in batch:
+                    self._queue.task_done()
@@ -2,10 +2,22 @@
 Comprehensive Patient Profile Management
 Collects and manages detailed patient information for accurate diagnosis
 """
+import re
 from typing import Dict, List, Optional
 from dataclasses import dataclass, field
 from datetime import datetime
 
+# Patterns used by extract_from_text, compiled once at import
+AGE_PATTERNS = (
+    re.compile(r'\b(\d{1,3})\s*(?:years?\s*old|yrs?\s*old|y\.?o\.?)\b'),
+    re.compile(r'\b(?:i\'m|i\s+am|im)\s+(\d{1,3})\b'),
+    re.compile(r'\bage[:\s]+(\d{1,3})\b'),
+)
+WEIGHT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:kg|kilos?|kilograms?)')
+HEIGHT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:cm|centimeters?)')
+SEVERITY_SCORE_RE = re.compile(r'(\d+)\s*(?:/10|out of 10|scale)')
+ALLERGY_RE = re.compile(r'allergic to (\w+)')
+
 @dataclass
 class PatientProfile:
     """Complete patient information profile"""
@@ -229,19 +241,12 @@ class PatientProfileExtractor:
     @staticmethod
     def extract_from_text(text: str, existing_profile: Optional[PatientProfile] = None) -> PatientProfile:
         """Extract patient information from text"""
-        import re
-        
         profile = existing_profile or PatientProfile()
         text_lower = text.lower()
         
         # Extract age
-        age_patterns = [
-            r'\b(\d{1,3})\s*(?:years?\s*old|yrs?\s*old|y\.?o\.?)\b',
-            r'\b(?:i\'m|i\s+am|im)\s+(\d{1,3})\b',
-            r'\bage[:\s]+(\d{1,3})\b',
-        ]
-        for pattern in age_patterns:
-            match = re.search(pattern, text_lower)
+        for pattern in AGE_PATTERNS:
+            match = pattern.search(text_lower)
             if match:
                 profile.age = int(match.group(1))
                 break
@@ -253,17 +258,17 @@ class PatientProfileExtractor:
             profile.gender = 'Female'
         
         # Extract weight
-        weight_match = re.search(r'(\d+(?:\.\d+)?)\s*(?:kg|kilos?|kilograms?)', text_lower)
+        weight_match = WEIGHT_RE.search(text_lower)
         if weight_match:
             profile.weight_kg = float(weight_match.group(1))
         
         # Extract height
-        height_match = re.search(r'(\d+(?:\.\d+)?)\s*(?:cm|centimeters?)', text_lower)
+        height_match = HEIGHT_RE.search(text_lower)
         if height_match:
             profile.height_cm = float(height_match.group(1))
         
         # Extract severity
-        severity_match = re.search(r'(\d+)\s*(?:/10|out of 10|scale)', text_lower)
+        severity_match = SEVERITY_SCORE_RE.search(text_lower)
         if severity_match:
             profile.severity_score = int(severity_match.group(1))
         
@@ -277,7 +282,7 @@ class PatientProfileExtractor:
         # Extract allergies
         if 'allergic to' in text_lower or 'allergy to' in text_lower:
             # Simple extraction - can be enhanced
-            allergy_match = re.search(r'allergic to (\w+)', text_lower)
+            allergy_match = ALLERGY_RE.search(text_lower)
             if allergy_match:
                 allergy = allergy_match.group(1)
                 if allergy not in profile.drug_allergies:
@@ -4,6 +4,7 @@ Replaces negative/alarming language with positive, motivational responses
 """
 
 import re
+import random
 from typing import Dict, List
 
 
@@ -14,6 +15,9 @@ class PositiveMessaging:
         self.severity_messages = self.load_severity_messages()
         self.positive_phrases = self.load_positive_phrases()
         self.negative_patterns = self.load_negative_patterns()
+        # Compile once instead of on every reframe
+        for pattern_dict in self.negative_patterns:
+            pattern_dict['regex'] = re.compile(pattern_dict['pattern'], re.IGNORECASE)
     
     def load_severity_messages(self) -> Dict:
         """Load positive messages for each severity level"""
@@ -130,12 +134,7 @@ class PositiveMessaging:
         reframed = message
         for pattern_dict in self.negative_patterns:
             if severity != 'severe' or pattern_dict['context'] != 'emergency':
-                reframed = re.sub(
-                    pattern_dict['pattern'],
-                    pattern_dict['replacement'],
-                    reframed,
-                    flags=re.IGNORECASE
-                )
+                reframed = pattern_dict['regex'].sub(pattern_dict['replacement'], reframed)
         
         # Add positive framing
         reframed = self.add_supportive_tone(reframed, severity)
@@ -183,7 +182,6 @@ class PositiveMessaging:
     
     def get_encouragement(self) -> str:
         """Get random encouragement message"""
-        import random
         return random.choice(self.positive_phrases['encouragement'])
     
     def format_care_tips(self, tips: List[str]) -> str:
@@ -7,6 +7,9 @@ from database import db
 import re
 from datetime import datetime
 
+NUMBER_RE = re.compile(r'^\d+(\.\d+)?$')
+BLOOD_GROUP_RE = re.compile(r'^(A|B|AB|O)[+-]$')
+
 class ProfileRegistrationFlow:
     """Manages the conversational flow for user profile registration"""
     
@@ -39,7 +42,7 @@ class ProfileRegistrationFlow:
             'id': 'weight',
             'question': "What's your weight in kilograms? (e.g., 70)",
             'field': 'weight_kg',
-            'validation': lambda x: re.match(r'^\d+(\.\d+)?$', x) and 10 < float(x) < 300,
+            'validation': lambda x: NUMBER_RE.match(x) and 10 < float(x) < 300,
             'error_message': "Please provide a valid weight in kg (10-300).",
             'parser': lambda x: float(x)
         },
@@ -47,7 +50,7 @@ class ProfileRegistrationFlow:
             'id': 'height',
             'question': "What's your height in centimeters? (e.g., 172)",
             'field': 'height_cm',
-            'validation': lambda x: re.match(r'^\d+(\.\d+)?$', x) and 50 < float(x) < 250,
+            'validation': lambda x: NUMBER_RE.match(x) and 50 < float(x) < 250,
             'error_message': "Please provide a valid height in cm (50-250).",
             'parser': lambda x: float(x)
         },
@@ -55,7 +58,7 @@ class ProfileRegistrationFlow:
             'id': 'blood_group',
             'question': "What's your blood group? (e.g., O+, A-, B+, AB+)\n(Type 'skip' if you don't know)",
             'field': 'blood_group',
-            'validation': lambda x: x.lower() == 'skip' or re.match(r'^(A|B|AB|O)[+-]$', x.upper()),
+            'validation': lambda x: x.lower() == 'skip' or BLOOD_GROUP_RE.match(x.upper()),
             'error_message': "Please provide a valid blood group (A+, A-, B+, B-, AB+, AB-, O+, O-) or type 'skip'.",
             'parser': lambda x: None if x.lower() == 'skip' else x.upper(),
             'optional': True
@@ -188,70 +191,76 @@ Ready to start? Let's begin with your basic information! 😊"""
     def save_profile(user_id: str, profile_data: Dict) -> bool:
         """Save profile to database"""
         try:
-            # Create user profile
-            success = db.create_user_profile(
-                user_id=user_id,
-                name=profile_data.get('name'),
-                age=profile_data.get('age'),
-                gender=profile_data.get('gender'),
-                blood_group=profile_data.get('blood_group'),
-                weight_kg=profile_data.get('weight_kg'),
-                height_cm=profile_data.get('height_cm')
-            )
-            
-            if not success:
-                return False
-            
-            # Calculate and update BMI
-            if profile_data.get('weight_kg') and profile_data.get('height_cm'):
-                height_m = profile_data['height_cm'] / 100
-                bmi = round(profile_data['weight_kg'] / (height_m ** 2), 1)
-                db.update_user_profile(user_id, bmi=bmi)
-            
-            # Add allergies
-            allergies = profile_data.get('allergies', [])
-            for allergy in allergies:
-                # Determine allergy type
-                allergy_lower = allergy.lower()
-                if any(drug in allergy_lower for drug in ['penicillin', 'aspirin', 'ibuprofen', 'medication', 'medicine', 'drug']):
-                    allergy_type = 'drug'
-                elif any(food in allergy_lower for food in ['peanut', 'milk', 'egg', 'shellfish', 'wheat', 'soy', 'food']):
-                    allergy_type = 'food'
-                else:
-                    allergy_type = 'environmental'
+            # One commit for the profile and all of its rows; a failure
+            # part-way leaves no half-saved profile behind
+            with db.transaction(immediate=True):
+                # Create user profile
+                success = db.create_user_profile(
+                    user_id=user_id,
+                    name=profile_data.get('name'),
+                    age=profile_data.get('age'),
+                    gender=profile_data.get('gender'),
+                    blood_group=profile_data.get('blood_group'),
+                    weight_kg=profile_data.get('weight_kg'),
+                    height_cm=profile_data.get('height_cm')
+                )
+                
+                if not success:
+                    return False
+                
+                # Calculate and update BMI
+                if profile_data.get('weight_kg') and profile_data.get('height_cm'):
+                    height_m = profile_data['height_cm'] / 100
+                    bmi = round(profile_data['weight_kg'] / (height_m ** 2), 1)
+                    db.update_user_profile(user_id, bmi=bmi)
+                
+                # Add allergies
+                allergies = profile_data.get('allergies', [])
+                allergy_rows = []
+                for allergy in allergies:
+                    # Determine allergy type
+                    allergy_lower = allergy.lower()
+                    if any(drug in allergy_lower for drug in ['penicillin', 'aspirin', 'ibuprofen', 'medication', 'medicine', 'drug']):
+                        allergy_type = 'drug'
+                    elif any(food in allergy_lower for food in ['peanut', 'milk', 'egg', 'shellfish', 'wheat', 'soy', 'food']):
+                        allergy_type = 'food'
+                    else:
+                        allergy_type = 'environmental'
+                    
+                    allergy_rows.append((allergy_type, allergy, 'unknown'))
+                if allergy_rows:
+                    db.add_allergies(user_id, allergy_rows)
                 
-                db.add_allergy(user_id, allergy_type, allergy, 'unknown')
-            
-            # Add chronic conditions
-            conditions = profile_data.get('chronic_conditions', [])
-            for condition in conditions:
-                db.add_chronic_condition(user_id, condition, None, 'unknown')
-            
-            # Add medications
-            medications = profile_data.get('current_medications', [])
-            for medication in medications:
-                db.add_medication(user_id, medication, None, None)
-            
-            # Add injuries to medical history
-            injuries = profile_data.get('past_injuries', [])
-            for injury in injuries:
-                db.add_symptom_to_history(
+                # Add chronic conditions
+                conditions = profile_data.get('chronic_conditions', [])
+                if conditions:
+                    db.add_chronic_conditions(user_id, [(condition, None, 'unknown', None) for condition in conditions])
+                
+                # Add medications
+                medications = profile_data.get('current_medications', [])
+                if medications:
+                    db.add_medications(user_id, [(medication, None, None, None, None) for medication in medications])
+                
+                # Add injuries to medical history
+                injuries = profile_data.get('past_injuries', [])
+                for injury in injuries:
+                    db.add_symptom_to_history(
+                        user_id=user_id,
+                        symptom_name=injury,
+                        symptom_date=None,
+                        diagnosis="Past injury/surgery"
+                    )
+                
+                # Add welcome note
+                db.add_doctor_note(
                     user_id=user_id,
-                    symptom_name=injury,
-                    symptom_date=None,
-                    diagnosis="Past injury/surgery"
+                    note_text="Profile created successfully. Welcome to MediChat!",
+                    note_type="registration",
+                    created_by="System"
                 )
-            
-            # Add welcome note
-            db.add_doctor_note(
-                user_id=user_id,
-                note_text="Profile created successfully. Welcome to MediChat!",
-                note_type="registration",
-                created_by="System"
-            )
-            
-            return True
-            
+                
+                return True
+                
         except Exception as e:
             print(f"Error saving profile: {e}")
             return False
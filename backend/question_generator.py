@@ -2,8 +2,18 @@
 Medical Question Generator
 Generates relevant follow-up questions based on symptoms
 """
+import re
 from typing import List, Dict
 
+# Any mention of the patient's age, as one alternation compiled at import
+AGE_MENTION_RE = re.compile('|'.join([
+    r'\b\d{1,3}\s*(?:years?\s*old|yrs?\s*old|y\.?o\.?)\b',  # "25 years old", "25 yrs old", "25 y.o"
+    r'\b(?:i\'m|i\s+am|im)\s+\d{1,3}\b',  # "I'm 25", "I am 25"
+    r'\bage[:\s]+\d{1,3}\b',  # "age: 25", "age 25"
+    r'\b\d{1,3}\s*year\b',  # "25 year"
+    r'\b(?:child|kid|baby|infant|toddler|teenager|teen|adult|senior|elderly)\b',  # Age groups
+]), re.IGNORECASE)
+
 class MedicalQuestionGenerator:
     """Generates structured medical questions for symptom assessment"""
     
@@ -133,15 +143,7 @@ class MedicalQuestionGenerator:
         combined_text = symptom_lower + " " + history_text
         
         # Enhanced age detection - check for numbers followed by age indicators or age ranges
-        import re
-        age_patterns = [
-            r'\b\d{1,3}\s*(?:years?\s*old|yrs?\s*old|y\.?o\.?)\b',  # "25 years old", "25 yrs old", "25 y.o"
-            r'\b(?:i\'m|i\s+am|im)\s+\d{1,3}\b',  # "I'm 25", "I am 25"
-            r'\bage[:\s]+\d{1,3}\b',  # "age: 25", "age 25"
-            r'\b\d{1,3}\s*year\b',  # "25 year"
-            r'\b(?:child|kid|baby|infant|toddler|teenager|teen|adult|senior|elderly)\b',  # Age groups
-        ]
-        has_age = any(re.search(pattern, combined_text, re.IGNORECASE) for pattern in age_patterns)
+        has_age = AGE_MENTION_RE.search(combined_text) is not None
         
         return {
             'onset_time': any(word in combined_text for word in ['started', 'began', 'since', 'ago', 'yesterday', 'today', 'morning', 'night', 'week']),
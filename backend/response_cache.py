@@ -3,13 +3,31 @@ Response Cache System
 Implements caching for frequent queries to improve response times
 """
 
+import os
+import sqlite3
 import hashlib
 import json
 import time
+import logging
+import threading
+from lazy_modules import lazy_import
 from typing import Optional, Dict, Any
 from collections import OrderedDict
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+# Optional imports for semantic caching (disabled when unavailable)
+try:
+    import numpy as np
+    sentence_transformers = lazy_import('sentence_transformers')
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+# Answers are reused across users, so matching by similarity is opt-in
+SEMANTIC_CACHE_ENABLED = os.environ.get('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+
 
 class LRUCache:
     """Least Recently Used Cache implementation"""
@@ -51,6 +69,10 @@ class LRUCache:
         if len(self.cache) > self.capacity:
             self.cache.popitem(last=False)
     
+    def invalidate(self, key: str):
+        """Drop one entry if present"""
+        self.cache.pop(key, None)
+    
     def clear(self):
         """Clear all cache"""
         self.cache.clear()
@@ -143,6 +165,209 @@ class ResponseCache:
 response_cache = ResponseCache(capacity=200)
 
 
+class SemanticCache:
+    """
+    LLM response cache keyed by query embedding
+    
+    Near-identical questions ("what causes a cough?" / "what causes coughing")
+    map to close embeddings, so a cosine match above the threshold returns the
+    earlier answer instead of calling the LLM. Entries live in a fixed-size
+    ring; a brute-force dot product over a few hundred normalized vectors takes
+    well under a millisecond, so no ANN index is needed.
+    
+    Off unless SEMANTIC_CACHE_ENABLED=true: a question that differs only in
+    age, dose or a negation can still score above the threshold and get
+    another user's answer. The embedder is never loaded on the request path;
+    until warm_up() or use_embedder() provides one, every lookup misses.
+    """
+    
+    EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    
+    def __init__(self, capacity: int = 500, threshold: float = 0.95, ttl: int = 3600,
+                 enabled: bool = SEMANTIC_CACHE_ENABLED):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.embedder = None
+        self.embeddings = None  # capacity x dim matrix of normalized vectors
+        self.entries = [None] * capacity  # (response, expiry) per row
+        self.next_slot = 0
+        self.hits = 0
+        self.misses = 0
+        self._disabled = not (SEMANTIC_CACHE_AVAILABLE and enabled)
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        return not self._disabled
+    
+    def use_embedder(self, embedder):
+        """Share an already loaded EMBEDDING_MODEL instance instead of loading a copy"""
+        if not self._disabled:
+            self.embedder = embedder
+    
+    def warm_up(self):
+        """Load the embedder at startup (no-op when disabled or already shared)"""
+        if self._disabled or self.embedder is not None:
+            return
+        try:
+            embedder = sentence_transformers.SentenceTransformer(self.EMBEDDING_MODEL)
+        except Exception as e:
+            logger.error(f"Failed to load semantic cache embedder: {str(e)}")
+            self._disabled = True
+            return
+        if self.embedder is None:
+            self.embedder = embedder
+    
+    def _embed(self, query: str):
+        """Embed a query, or None while the cache is disabled or not warmed up"""
+        if self._disabled or self.embedder is None:
+            return None
+        
+        return self.embedder.encode([query.lower().strip()], normalize_embeddings=True)[0].astype(np.float32)
+    
+    def get(self, query: str) -> Optional[str]:
+        """Get the cached response of the most similar earlier query"""
+        vector = self._embed(query)
+        if vector is None:
+            return None
+        
+        with self._lock:
+            if self.embeddings is None:
+                self.misses += 1
+                return None
+            
+            scores = self.embeddings @ vector
+            best = int(np.argmax(scores))
+            entry = self.entries[best]
+            if entry and scores[best] >= self.threshold and datetime.now() <= entry[1]:
+                self.hits += 1
+                return entry[0]
+            
+            self.misses += 1
+            return None
+    
+    def put(self, query: str, response: str):
+        """Cache a response, overwriting the oldest entry when full"""
+        vector = self._embed(query)
+        if vector is None:
+            return
+        
+        with self._lock:
+            if self.embeddings is None:
+                self.embeddings = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+            
+            self.embeddings[self.next_slot] = vector
+            self.entries[self.next_slot] = (response, datetime.now() + timedelta(seconds=self.ttl))
+            self.next_slot = (self.next_slot + 1) % self.capacity
+    
+    def clear(self):
+        """Clear all cached responses"""
+        with self._lock:
+            self.embeddings = None
+            self.entries = [None] * self.capacity
+            self.next_slot = 0
+            self.hits = 0
+            self.misses = 0
+    
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total > 0 else 0
+        
+        return {
+            'enabled': not self._disabled,
+            'size': sum(1 for entry in self.entries if entry),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': f"{hit_rate:.2f}%"
+        }
+
+
+# Global semantic cache instance
+semantic_cache = SemanticCache()
+
+
+class EmbeddingCache:
+    """
+    Query embedding cache for the RAG retriever
+    
+    An in-memory LRU sits in front of a small SQLite file, so repeated
+    queries skip the SentenceTransformer forward pass both within a worker
+    and across restarts/workers. Vectors are stored as raw float32 bytes.
+    """
+    
+    def __init__(self, model_name: str, capacity: int = 4096, db_path: Optional[str] = None):
+        self.model_name = model_name
+        self.cache = LRUCache(capacity)
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        
+        if db_path and SEMANTIC_CACHE_AVAILABLE:
+            try:
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding disk cache disabled: {str(e)}")
+                self._conn = None
+    
+    def generate_cache_key(self, query: str) -> str:
+        """Generate cache key from model name and normalized query"""
+        return hashlib.md5(f"{self.model_name}_{query.lower().strip()}".encode()).hexdigest()
+    
+    def get(self, query: str):
+        """Get the cached embedding for a query (memory first, then disk)"""
+        key = self.generate_cache_key(query)
+        with self._lock:
+            vector = self.cache.get(key)
+            if vector is not None or self._conn is None:
+                return vector
+            
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            
+            vector = np.frombuffer(row[0], dtype=np.float32)
+            self.cache.put(key, vector, ttl=0)
+            self.disk_hits += 1
+            return vector
+    
+    def put(self, query: str, vector):
+        """Cache an embedding in memory and on disk"""
+        key = self.generate_cache_key(query)
+        vector = np.ascontiguousarray(vector, dtype=np.float32)
+        with self._lock:
+            self.cache.put(key, vector, ttl=0)
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        (key, vector.tobytes())
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to persist embedding: {str(e)}")
+    
+    def clear(self):
+        """Clear the in-memory layer (the disk layer stays valid for this model)"""
+        with self._lock:
+            self.cache.clear()
+            self.disk_hits = 0
+    
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        stats = self.cache.get_stats()
+        stats['disk_enabled'] = self._conn is not None
+        stats['disk_hits'] = self.disk_hits
+        return stats
+
+
 # Symptom tree pre-loading
 class SymptomTree:
     """Pre-loaded symptom decision trees for fast responses"""
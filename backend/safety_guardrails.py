@@ -2,6 +2,7 @@
 Safety Guardrails System
 Prevents unsafe medical suggestions and enforces safety rules
 """
+from keyword_scanner import KeywordScanner
 
 DANGEROUS_KEYWORDS = [
     'dosage', 'prescription', 'how much', 'how many pills', 'how many tablets',
@@ -14,6 +15,18 @@ MEDICATION_KEYWORDS = [
     'antibiotic', 'painkiller', 'prescription'
 ]
 
+# Words that turn a medication question into a dosage request
+DOSAGE_WORDS = ('how much', 'dosage', 'dose', 'how many')
+
+DANGEROUS_ACTIONS = ('cut myself', 'hurt myself', 'perform surgery', 'remove', 'extract')
+
+SAFE_QUERY_PHRASES = ('what is', 'used for', 'side effects', 'interactions', 'warnings')
+
+# Every list above is matched in one pass; callers intersect the hits per list
+SAFETY_SCANNER = KeywordScanner(
+    DANGEROUS_KEYWORDS + MEDICATION_KEYWORDS + list(DOSAGE_WORDS) + list(DANGEROUS_ACTIONS) + list(SAFE_QUERY_PHRASES)
+)
+
 def check_safety(user_message):
     """
     Check if user message contains dangerous requests
@@ -27,20 +40,19 @@ def check_safety(user_message):
     if not user_message:
         return {'safe': True}
     
-    message_lower = user_message.lower()
+    hits = SAFETY_SCANNER.scan(user_message)
     
     # Check for dangerous keywords
-    for keyword in DANGEROUS_KEYWORDS:
-        if keyword in message_lower:
-            return {
-                'safe': False,
-                'reason': 'dosage_request',
-                'message': 'I cannot provide specific dosages or prescriptions. Please consult a healthcare professional or pharmacist for medication guidance.'
-            }
+    if hits.intersection(DANGEROUS_KEYWORDS):
+        return {
+            'safe': False,
+            'reason': 'dosage_request',
+            'message': 'I cannot provide specific dosages or prescriptions. Please consult a healthcare professional or pharmacist for medication guidance.'
+        }
     
     # Check for medication requests
-    if any(keyword in message_lower for keyword in MEDICATION_KEYWORDS):
-        if any(word in message_lower for word in ['how much', 'dosage', 'dose', 'how many']):
+    if hits.intersection(MEDICATION_KEYWORDS):
+        if hits.intersection(DOSAGE_WORDS):
             return {
                 'safe': False,
                 'reason': 'medication_dosage',
@@ -48,14 +60,12 @@ def check_safety(user_message):
             }
     
     # Check for self-harm or dangerous procedures
-    dangerous_actions = ['cut myself', 'hurt myself', 'perform surgery', 'remove', 'extract']
-    for action in dangerous_actions:
-        if action in message_lower:
-            return {
-                'safe': False,
-                'reason': 'dangerous_action',
-                'message': 'I cannot provide guidance on procedures that could cause harm. Please seek immediate professional medical help.'
-            }
+    if hits.intersection(DANGEROUS_ACTIONS):
+        return {
+            'safe': False,
+            'reason': 'dangerous_action',
+            'message': 'I cannot provide guidance on procedures that could cause harm. Please seek immediate professional medical help.'
+        }
     
     return {'safe': True}
 
@@ -84,18 +94,17 @@ def validate_medication_info(medication_name, user_query):
     Returns:
         dict: Validation result
     """
-    query_lower = user_query.lower()
+    hits = SAFETY_SCANNER.scan(user_query)
     
     # Unsafe queries
-    if any(word in query_lower for word in ['how much', 'dosage', 'dose', 'how many']):
+    if hits.intersection(DOSAGE_WORDS):
         return {
             'safe': False,
             'message': f'I can tell you what {medication_name} is used for, but I cannot provide dosage information. Please consult your doctor or pharmacist.'
         }
     
     # Safe queries (general information)
-    safe_queries = ['what is', 'used for', 'side effects', 'interactions', 'warnings']
-    if any(query in query_lower for query in safe_queries):
+    if hits.intersection(SAFE_QUERY_PHRASES):
         return {
             'safe': True,
             'type': 'general_info',
@@ -3,20 +3,73 @@ Session Memory System
 Manages conversation context and persistent memory across sessions
 """
 
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Any
 import json
 
+# Optional Redis backend so every worker process sees the same sessions
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+REDIS_URL = os.environ.get("REDIS_URL")
+SESSION_TTL_SECONDS = 3600
+
+logger = logging.getLogger(__name__)
+
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True) if REDIS_AVAILABLE and REDIS_URL else None
+
 class SessionMemory:
     """Manages chat session memory with configurable message limits"""
     
     def __init__(self, user_id: int, session_id: str, max_messages: int = 20):
         self.user_id = user_id
         self.session_id = session_id
-        self.messages: List[Dict] = []
+        self._messages = deque(maxlen=max_messages)
         self.max_messages = max_messages
         self.memory_enabled = True
     
+    @property
+    def redis_key(self) -> str:
+        return f"chat:{self.session_id}"
+    
+    @property
+    def messages(self) -> List[Dict]:
+        """Messages in chronological order"""
+        if redis_client is None:
+            return list(self._messages)
+        try:
+            # Redis keeps the newest message at the head of the list
+            return [json.loads(item) for item in reversed(redis_client.lrange(self.redis_key, 0, -1))]
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable, using local messages for {self.session_id}: {str(e)}")
+            return list(self._messages)
+    
+    @messages.setter
+    def messages(self, messages: List[Dict]):
+        # The local copy is also the fallback while Redis is unreachable
+        self._messages = deque(messages, maxlen=self.max_messages)
+        if redis_client is None:
+            return
+        try:
+            pipe = redis_client.pipeline()
+            pipe.delete(self.redis_key)
+            if messages:
+                pipe.lpush(self.redis_key, *[json.dumps(message) for message in messages])
+                pipe.ltrim(self.redis_key, 0, self.max_messages - 1)
+                pipe.expire(self.redis_key, SESSION_TTL_SECONDS)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable, kept messages locally for {self.session_id}: {str(e)}")
+    
     def add_message(self, role: str, content: str, metadata: Optional[Dict] = None):
         """Add a message to session memory"""
         if not self.memory_enabled:
@@ -29,11 +82,20 @@ class SessionMemory:
             'metadata': metadata or {}
         }
         
-        self.messages.append(message)
+        # The deque drops the oldest message once max_messages is reached;
+        # with Redis it is the fallback while Redis is unreachable
+        self._messages.append(message)
         
-        # Keep only last N messages
-        if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages:]
+        if redis_client is not None:
+            try:
+                # Sliding window of the last N messages, dropped after inactivity
+                pipe = redis_client.pipeline()
+                pipe.lpush(self.redis_key, json.dumps(message))
+                pipe.ltrim(self.redis_key, 0, self.max_messages - 1)
+                pipe.expire(self.redis_key, SESSION_TTL_SECONDS)
+                pipe.execute()
+            except redis.RedisError as e:
+                logger.warning(f"Redis unavailable, kept message locally for {self.session_id}: {str(e)}")
     
     def get_context(self) -> List[Dict]:
         """Get conversation context for AI"""
@@ -79,21 +141,99 @@ class SessionMemory:
     
     def get_summary(self) -> Dict:
         """Get session summary"""
+        messages = self.messages
         return {
             'session_id': self.session_id,
-            'message_count': len(self.messages),
-            'first_message_time': self.messages[0]['timestamp'] if self.messages else None,
-            'last_message_time': self.messages[-1]['timestamp'] if self.messages else None,
+            'message_count': len(messages),
+            'first_message_time': messages[0]['timestamp'] if messages else None,
+            'last_message_time': messages[-1]['timestamp'] if messages else None,
             'memory_enabled': self.memory_enabled
         }
 
 
+class SessionData:
+    """Per-session symptom state; fixed slots instead of a dict per session"""
+    
+    __slots__ = (
+        'symptoms', 'current_medications', 'allergies', 'chronic_conditions',
+        'dynamic_assessment', 'current_symptom', 'follow_up_questions',
+        'question_index', 'answers'
+    )
+    
+    def __init__(self):
+        self.symptoms = []
+        self.current_medications = None
+        self.allergies = []
+        self.chronic_conditions = []
+        self.dynamic_assessment = None
+        self.current_symptom = None
+        self.follow_up_questions = None
+        self.question_index = 0
+        self.answers = {}
+
+
+class SessionStore(MutableMapping):
+    """Session dictionary bounded by size and idle time (LRU + TTL)"""
+    
+    def __init__(self, maxsize: int = 10000, ttl: int = 3600):
+        self.data = OrderedDict()  # key -> (value, last access time)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Request threads share the store; expiry checks and deletes must not interleave
+        self.lock = threading.RLock()
+    
+    def __getitem__(self, key: str) -> Any:
+        with self.lock:
+            value, last_access = self.data[key]
+            now = time.time()
+            if now - last_access > self.ttl:
+                self.data.pop(key, None)
+                raise KeyError(key)
+            
+            # Refresh idle timer and move to end (most recently used)
+            self.data[key] = (value, now)
+            self.data.move_to_end(key)
+            return value
+    
+    def __setitem__(self, key: str, value: Any):
+        with self.lock:
+            self.data[key] = (value, time.time())
+            self.data.move_to_end(key)
+            self.expire()
+            
+            # Remove least recently used if over capacity
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+    
+    def __delitem__(self, key: str):
+        with self.lock:
+            del self.data[key]
+    
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.data))
+    
+    def __len__(self) -> int:
+        return len(self.data)
+    
+    def expire(self):
+        """Drop sessions idle for longer than the TTL"""
+        with self.lock:
+            cutoff = time.time() - self.ttl
+            # Entries are ordered by last access, so stop at the first live one
+            while self.data:
+                key, (_, last_access) = next(iter(self.data.items()))
+                if last_access >= cutoff:
+                    break
+                self.data.pop(key, None)
+
+
 class SessionMemoryManager:
     """Manages multiple session memories"""
     
-    def __init__(self):
-        self.sessions: Dict[str, SessionMemory] = {}
-        self.session_data: Dict[str, Dict] = {}  # Additional session data storage
+    def __init__(self, max_sessions: int = 10000, session_ttl: int = 3600):
+        self.sessions = SessionStore(max_sessions, session_ttl)
+        self.session_data = SessionStore(max_sessions, session_ttl)  # Additional session data storage
     
     def get_or_create_session(self, user_id: int, session_id: str) -> SessionMemory:
         """Get existing session or create new one"""
@@ -162,36 +302,34 @@ class SessionMemoryManager:
             })
         return sessions
     
-    def get_memory(self, session_id: str) -> Dict:
-        """Get session data dictionary"""
-        if session_id not in self.session_data:
-            self.session_data[session_id] = {
-                'symptoms': [],
-                'current_medications': None,
-                'allergies': [],
-                'chronic_conditions': []
-            }
-        return self.session_data[session_id]
+    def get_memory(self, session_id: str) -> SessionData:
+        """Get session data, creating it for new sessions"""
+        # Under the store's lock so concurrent first requests share one object
+        with self.session_data.lock:
+            try:
+                return self.session_data[session_id]
+            except KeyError:
+                memory = SessionData()
+                self.session_data[session_id] = memory
+                return memory
+    
+    def find_memory(self, session_id: str) -> Optional[SessionData]:
+        """Get session data if the session exists, without creating it"""
+        return self.session_data.get(session_id)
     
     def add_symptom(self, session_id: str, symptom_data: Dict):
         """Add symptom to session data"""
-        memory = self.get_memory(session_id)
-        if 'symptoms' not in memory:
-            memory['symptoms'] = []
-        memory['symptoms'].append(symptom_data)
+        self.get_memory(session_id).symptoms.append(symptom_data)
     
     def set_medications(self, session_id: str, medications: List[str]):
         """Set current medications for session"""
-        memory = self.get_memory(session_id)
-        memory['current_medications'] = medications
+        self.get_memory(session_id).current_medications = medications
     
     def add_allergy(self, session_id: str, allergy: str):
         """Add allergy to session data"""
         memory = self.get_memory(session_id)
-        if 'allergies' not in memory:
-            memory['allergies'] = []
-        if allergy not in memory['allergies']:
-            memory['allergies'].append(allergy)
+        if allergy not in memory.allergies:
+            memory.allergies.append(allergy)
 
 
 # Global session manager instance
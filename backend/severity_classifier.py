@@ -1,8 +1,8 @@
 """
 Severity classification system for symptoms
 """
-import re
 from typing import Dict, List, Tuple
+from keyword_scanner import KeywordScanner
 
 class SeverityClassifier:
     """Classifies symptom severity based on keywords and patterns"""
@@ -37,6 +37,21 @@ class SeverityClassifier:
         'minor bruise', 'small cut', 'mild soreness'
     ]
     
+    # Score contributed by each keyword, in the order keywords are reported
+    KEYWORD_SCORES = {
+        keyword: score
+        for keywords, score in (
+            (EMERGENCY_KEYWORDS, 95),
+            (HIGH_SEVERITY_KEYWORDS, 75),
+            (MODERATE_SEVERITY_KEYWORDS, 50),
+            (LOW_SEVERITY_KEYWORDS, 25)
+        )
+        for keyword in keywords
+    }
+    
+    # Every keyword, matched in a single pass
+    KEYWORD_SCANNER = KeywordScanner(KEYWORD_SCORES)
+    
     @staticmethod
     def classify_severity(text: str) -> Tuple[str, int, List[str]]:
         """
@@ -48,33 +63,11 @@ class SeverityClassifier:
             severity_score: 0-100
             matched_keywords: List of keywords that matched
         """
-        text_lower = text.lower()
-        matched_keywords = []
-        severity_score = 0
-        
-        # Check for emergency keywords
-        for keyword in SeverityClassifier.EMERGENCY_KEYWORDS:
-            if keyword in text_lower:
-                matched_keywords.append(keyword)
-                severity_score = max(severity_score, 95)
-        
-        # Check for high severity keywords
-        for keyword in SeverityClassifier.HIGH_SEVERITY_KEYWORDS:
-            if keyword in text_lower:
-                matched_keywords.append(keyword)
-                severity_score = max(severity_score, 75)
-        
-        # Check for moderate severity keywords
-        for keyword in SeverityClassifier.MODERATE_SEVERITY_KEYWORDS:
-            if keyword in text_lower:
-                matched_keywords.append(keyword)
-                severity_score = max(severity_score, 50)
-        
-        # Check for low severity keywords
-        for keyword in SeverityClassifier.LOW_SEVERITY_KEYWORDS:
-            if keyword in text_lower:
-                matched_keywords.append(keyword)
-                severity_score = max(severity_score, 25)
+        # Single pass over the text; overlapping matches are kept so
+        # 'severe headache' also reports 'headache'
+        hits = SeverityClassifier.KEYWORD_SCANNER.scan(text)
+        matched_keywords = [keyword for keyword in SeverityClassifier.KEYWORD_SCORES if keyword in hits]
+        severity_score = max((SeverityClassifier.KEYWORD_SCORES[keyword] for keyword in matched_keywords), default=0)
         
         # Determine severity level
         if severity_score >= 90:
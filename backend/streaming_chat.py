@@ -17,16 +17,40 @@ from dotenv import load_dotenv
 
 # Import existing MediChat modules
 from database import db
+from message_writer import MessageWriter
 from safety_guardrails import check_safety
 from emergency_detection import detect_emergency
 from system_prompt import get_system_prompt
 from session_memory import session_manager
+from response_cache import semantic_cache
+from http_client import async_http_client, async_warm_up_connections
+
+# Optional fast JSON for the per-token SSE frames (falls back to stdlib json)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    json_loads = orjson.loads
+    
+    def json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+else:
+    json_loads = json.loads
+    json_dumps = json.dumps
 
 load_dotenv()
 
 # Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 MODEL_NAME = "meta-llama/llama-4-scout-17b-16e-instruct"
+# Recent messages included in the prompt context
+CONTEXT_HISTORY_LIMIT = 5
+
+# Chat messages are written in the background, batched per transaction
+message_writer = MessageWriter(db)
 
 # FastAPI app
 app = FastAPI(title="MediChat Streaming API")
@@ -40,6 +64,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_up():
+    """Open provider connections (and load the semantic cache model) in the background without delaying startup"""
+    asyncio.create_task(async_warm_up_connections())
+    if semantic_cache.enabled:
+        asyncio.create_task(asyncio.to_thread(semantic_cache.warm_up))
+
 # Pydantic models
 class ChatStreamRequest(BaseModel):
     user_id: str
@@ -75,7 +106,7 @@ async def stream_groq_response(messages: List[dict]) -> AsyncGenerator[str, None
     Stream response from Groq API
     Yields Server-Sent Events (SSE) formatted chunks
     """
-    client = AsyncGroq(api_key=GROQ_API_KEY)
+    client = AsyncGroq(api_key=GROQ_API_KEY, http_client=async_http_client)
     
     try:
         stream = await client.chat.completions.create(
@@ -91,56 +122,56 @@ async def stream_groq_response(messages: List[dict]) -> AsyncGenerator[str, None
                 delta = chunk.choices[0].delta
                 if delta.content:
                     # Format as SSE
-                    yield f"data: {json.dumps({'content': delta.content})}\n\n"
+                    yield f"data: {json_dumps({'content': delta.content})}\n\n"
         
         # Send completion signal
-        yield f"data: {json.dumps({'done': True})}\n\n"
+        yield f"data: {json_dumps({'done': True})}\n\n"
         
     except Exception as e:
         error_msg = f"Error streaming response: {str(e)}"
-        yield f"data: {json.dumps({'error': error_msg})}\n\n"
+        yield f"data: {json_dumps({'error': error_msg})}\n\n"
 
-def build_medical_context(session_id: str, user_message: str) -> str:
+async def build_medical_context(session_id: str, user_message: str) -> str:
     """Build context from session history and medical knowledge"""
-    # Get session history
-    history = db.get_session_history(session_id, limit=10)
+    # Fetch session history and session memory (past symptoms, diagnoses) in
+    # one round-trip on a worker thread so SQLite I/O doesn't block the event loop
+    bundle = await asyncio.to_thread(db.get_session_bundle, session_id, CONTEXT_HISTORY_LIMIT)
+    history = bundle['history']
+    session_memory = bundle['memory']
     
-    # Get session memory (past symptoms, diagnoses)
-    session_memory = db.get_session_memory(session_id)
-    
-    # Build context string
-    context = ""
+    # Collect context parts and join once at the end
+    parts = []
     
     # Add session memory if available
     if session_memory.get('has_history'):
-        context += "\n\nPATIENT HISTORY:\n"
+        parts.append("\n\nPATIENT HISTORY:\n")
         
         if session_memory.get('past_symptoms'):
-            context += "Previous Symptoms:\n"
+            parts.append("Previous Symptoms:\n")
             for symptom in session_memory['past_symptoms'][:3]:
-                context += f"  • {symptom['symptom']}"
+                parts.append(f"  • {symptom['symptom']}")
                 if symptom.get('severity'):
-                    context += f" ({symptom['severity']})"
-                context += "\n"
+                    parts.append(f" ({symptom['severity']})")
+                parts.append("\n")
         
         if session_memory.get('past_diagnoses'):
-            context += "\nPrevious Diagnoses:\n"
+            parts.append("\nPrevious Diagnoses:\n")
             for diagnosis in session_memory['past_diagnoses'][:2]:
                 summary = diagnosis['summary']
                 if 'Condition:' in summary:
                     condition = summary.split('Condition:')[1].split('\n')[0].strip()
-                    context += f"  • {condition}\n"
+                    parts.append(f"  • {condition}\n")
     
     # Add recent conversation
-    context += "\n\nRECENT CONVERSATION:\n"
-    for msg in history[-5:]:
+    parts.append("\n\nRECENT CONVERSATION:\n")
+    for msg in history:
         role = "Patient" if msg['role'] == 'user' else "You"
-        context += f"{role}: {msg['content']}\n"
+        parts.append(f"{role}: {msg['content']}\n")
     
     # Add current message
-    context += f"Patient: {user_message}\n"
+    parts.append(f"Patient: {user_message}\n")
     
-    return context
+    return "".join(parts)
 
 @app.post("/api/chat/stream")
 async def chat_stream(request: ChatStreamRequest):
@@ -156,35 +187,46 @@ async def chat_stream(request: ChatStreamRequest):
     emergency_check = detect_emergency(request.message)
     if emergency_check['is_emergency']:
         # Return emergency response immediately (non-streaming)
-        db.save_message(request.session_id, 'user', request.message, 'text', None)
-        db.save_message(request.session_id, 'assistant', emergency_check['message'], None, None)
+        message_writer.save_message(request.session_id, 'user', request.message, 'text', None)
+        message_writer.save_message(request.session_id, 'assistant', emergency_check['message'], None, None)
         
         async def emergency_stream():
-            yield f"data: {json.dumps({'content': emergency_check['message'], 'is_emergency': True})}\n\n"
-            yield f"data: {json.dumps({'done': True})}\n\n"
+            yield f"data: {json_dumps({'content': emergency_check['message'], 'is_emergency': True})}\n\n"
+            yield f"data: {json_dumps({'done': True})}\n\n"
         
         return StreamingResponse(emergency_stream(), media_type="text/event-stream")
     
     safety_check = check_safety(request.message)
     if not safety_check['safe']:
-        db.save_message(request.session_id, 'user', request.message, 'text', None)
-        db.save_message(request.session_id, 'assistant', safety_check['message'], None, None)
+        message_writer.save_message(request.session_id, 'user', request.message, 'text', None)
+        message_writer.save_message(request.session_id, 'assistant', safety_check['message'], None, None)
         
         async def safety_stream():
-            yield f"data: {json.dumps({'content': safety_check['message'], 'safety_warning': True})}\n\n"
-            yield f"data: {json.dumps({'done': True})}\n\n"
+            yield f"data: {json_dumps({'content': safety_check['message'], 'safety_warning': True})}\n\n"
+            yield f"data: {json_dumps({'done': True})}\n\n"
         
         return StreamingResponse(safety_stream(), media_type="text/event-stream")
     
     # Save user message
-    db.create_session(request.session_id)
-    db.save_message(request.session_id, 'user', request.message, 'text', None)
+    message_writer.save_message(request.session_id, 'user', request.message, 'text', None, create_session=True)
     
     # Build context
     if request.include_context:
-        context = build_medical_context(request.session_id, request.message)
+        context = await build_medical_context(request.session_id, request.message)
     else:
         context = request.message
+        
+        # Without conversation context the answer only depends on the message,
+        # so a near-identical earlier question can be answered from cache
+        cached_response = await asyncio.to_thread(semantic_cache.get, request.message)
+        if cached_response is not None:
+            message_writer.save_message(request.session_id, 'assistant', cached_response, None, None)
+            
+            async def cached_stream():
+                yield f"data: {json_dumps({'content': cached_response, 'cached': True})}\n\n"
+                yield f"data: {json_dumps({'done': True})}\n\n"
+            
+            return StreamingResponse(cached_stream(), media_type="text/event-stream")
     
     # Build messages for AI
     system_prompt = get_system_prompt()
@@ -204,18 +246,21 @@ async def chat_stream(request: ChatStreamRequest):
         # Save complete response to database
         if collected_response:
             # Extract content from SSE chunks
-            full_response = ""
+            response_parts = []
             for chunk in collected_response:
                 if chunk.startswith("data: "):
                     try:
-                        data = json.loads(chunk[6:])
+                        data = json_loads(chunk[6:])
                         if 'content' in data:
-                            full_response += data['content']
+                            response_parts.append(data['content'])
                     except:
                         pass
+            full_response = "".join(response_parts)
             
             if full_response:
-                db.save_message(request.session_id, 'assistant', full_response, None, None)
+                message_writer.save_message(request.session_id, 'assistant', full_response, None, None)
+                if not request.include_context:
+                    await asyncio.to_thread(semantic_cache.put, request.message, full_response)
     
     return StreamingResponse(response_stream(), media_type="text/event-stream")
 
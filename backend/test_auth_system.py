@@ -0,0 +1,66 @@
+"""
+Tests for password hashing and verification (tagged and legacy hashes)
+and registration
+"""
+import hashlib
+
+import pytest
+
+import auth_system
+from auth_system import AuthenticationSystem, PASSWORD_HASH_ALGORITHM, PASSWORD_HASH_ITERATIONS
+from database import MediChatDatabase
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    database = MediChatDatabase(str(tmp_path / 'medichat.db'))
+    monkeypatch.setattr(auth_system, 'db', database)
+    AuthenticationSystem.create_auth_tables()
+    return database
+
+
+def legacy_hash(password, salt):
+    """Untagged hash as written before hashes carried their algorithm and cost"""
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000).hex()
+
+
+def test_tagged_hash_round_trip():
+    password_hash, salt = AuthenticationSystem.hash_password('correct horse')
+
+    assert password_hash.startswith(f"pbkdf2_{PASSWORD_HASH_ALGORITHM}${PASSWORD_HASH_ITERATIONS}$")
+    assert AuthenticationSystem.verify_password('correct horse', password_hash, salt)
+    assert not AuthenticationSystem.verify_password('wrong horse', password_hash, salt)
+
+
+def test_legacy_untagged_hash_still_verifies():
+    salt = 'a1b2c3d4'
+    password_hash = legacy_hash('s3cret', salt)
+
+    assert AuthenticationSystem.verify_password('s3cret', password_hash, salt)
+    assert not AuthenticationSystem.verify_password('s3cret!', password_hash, salt)
+
+
+def test_tagged_hash_uses_its_own_cost():
+    salt = 'a1b2c3d4'
+    digest = hashlib.pbkdf2_hmac('sha512', b'pw', salt.encode('utf-8'), 1000, dklen=32).hex()
+
+    assert AuthenticationSystem.verify_password('pw', f"pbkdf2_sha512$1000${digest}", salt)
+
+
+def test_malformed_hash_is_rejected():
+    assert not AuthenticationSystem.verify_password('pw', 'not-hex', 'salt')
+    assert not AuthenticationSystem.verify_password('pw', 'pbkdf2_sha256$100000$zz', 'salt')
+    assert not AuthenticationSystem.verify_password('pw', 'pbkdf2_sha256$many$00', 'salt')
+    assert not AuthenticationSystem.verify_password('pw', 'pbkdf2_sha256$00', 'salt')
+    assert not AuthenticationSystem.verify_password('pw', 'pbkdf2_nosuchhash$1000$00', 'salt')
+
+
+def test_duplicate_email_is_rejected_before_hashing(database, monkeypatch):
+    success, _, user_id = AuthenticationSystem.register_user('ann@example.com', 'pw', 'Ann')
+    assert success and user_id
+
+    def fail(*args, **kwargs):
+        raise AssertionError('hashed a password for a registered email')
+    monkeypatch.setattr(AuthenticationSystem, 'hash_password', staticmethod(fail))
+
+    assert AuthenticationSystem.register_user('ann@example.com', 'pw2', 'Ann') == (False, "Email already registered", None)
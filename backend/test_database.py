@@ -0,0 +1,96 @@
+"""
+Tests for MediChatDatabase's connection pool, transaction() and the
+per-session read cache
+"""
+import threading
+
+import pytest
+
+from database import MediChatDatabase
+
+
+@pytest.fixture
+def database(tmp_path):
+    return MediChatDatabase(str(tmp_path / 'medichat.db'))
+
+
+def contents(history):
+    # Timestamps have one-second resolution, so same-second order is arbitrary
+    return sorted(message['content'] for message in history)
+
+
+def read_in_thread(func, *args):
+    """Run a read on another thread (so on another pooled connection)"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func(*args)))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_history_is_cached_until_a_write(database):
+    database.create_session('s1')
+    database.save_message('s1', 'user', 'first')
+    assert [m['content'] for m in database.get_session_history('s1')] == ['first']
+
+    database.save_message('s1', 'assistant', 'second')
+    assert contents(database.get_session_history('s1')) == ['first', 'second']
+
+
+def test_transaction_invalidates_cache_after_commit(database):
+    database.create_session('s1')
+    database.save_message('s1', 'user', 'first')
+
+    with database.transaction(immediate=True):
+        database.save_message('s1', 'assistant', 'second')
+        # A concurrent reader still sees (and caches) the committed state
+        during = read_in_thread(database.get_session_history, 's1')
+        assert [m['content'] for m in during] == ['first']
+
+    # The commit must drop what that reader cached
+    after = read_in_thread(database.get_session_history, 's1')
+    assert contents(after) == ['first', 'second']
+    assert len(database.get_session_history('s1')) == 2
+
+
+def test_uncommitted_reads_are_not_cached(database):
+    database.create_session('s1')
+    database.save_message('s1', 'user', 'first')
+
+    with pytest.raises(RuntimeError):
+        with database.transaction(immediate=True):
+            database.save_message('s1', 'assistant', 'rolled back')
+            # Reads on the transaction's connection see the pending row...
+            assert len(database.get_session_history('s1')) == 2
+            raise RuntimeError('abort')
+
+    # ...but it must not outlive the rollback in the cache
+    assert [m['content'] for m in database.get_session_history('s1')] == ['first']
+
+
+def test_session_memory_is_returned_as_a_copy(database):
+    database.create_session('s1')
+    database.save_symptom('s1', 'headache', 'mild')
+
+    memory = database.get_session_memory('s1')
+    memory['past_symptoms'].clear()
+
+    assert len(database.get_session_memory('s1')['past_symptoms']) == 1
+
+
+def test_nested_transaction_joins_outer_commit(database):
+    with database.transaction():
+        database.create_session('s1')
+        with database.transaction():
+            database.save_message('s1', 'user', 'hello')
+
+    assert len(read_in_thread(database.get_session_history, 's1')) == 1
+
+
+def test_connections_are_returned_to_the_pool(database):
+    database.get_session_history('s1')
+    database.release_connection()
+    idle = database._pool.qsize()
+
+    read_in_thread(lambda: (database.get_session_history('s1'), database.release_connection()))
+    assert database._pool.qsize() == idle
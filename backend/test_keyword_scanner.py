@@ -0,0 +1,50 @@
+"""
+Tests that KeywordScanner finds exactly what the naive
+`for keyword in KEYWORDS: if keyword in text` loops it replaced found
+"""
+import pytest
+
+from emergency_detection import EMERGENCY_SCANNER
+from keyword_scanner import BACKENDS, KeywordScanner
+from safety_guardrails import SAFETY_SCANNER
+from severity_classifier import SeverityClassifier
+
+SCANNERS = {
+    'severity': SeverityClassifier.KEYWORD_SCANNER,
+    'safety': SAFETY_SCANNER,
+    'emergency': EMERGENCY_SCANNER,
+}
+
+
+def naive_scan(keywords, text):
+    text_lower = text.lower()
+    return {keyword for keyword in keywords if keyword in text_lower}
+
+
+def sample_texts(keywords):
+    """Each keyword on its own, glued to its neighbours, and all at once"""
+    texts = ['', 'I feel fine today', 'NOTHING TO SEE HERE.']
+    for keyword in keywords:
+        texts.append(f"Since yesterday I have {keyword.upper()}, please help")
+        texts.append(f"x{keyword}x")
+    texts.extend(a + b for a, b in zip(keywords, keywords[1:]))
+    texts.append(' '.join(keywords))
+    texts.append(''.join(keywords))
+    return texts
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('name', sorted(SCANNERS))
+def test_scan_matches_naive_substring_loop(name, backend):
+    scanner = KeywordScanner(SCANNERS[name].keywords, backend=backend)
+    for text in sample_texts(scanner.keywords):
+        expected = naive_scan(scanner.keywords, text)
+        assert scanner.scan(text) == expected, text
+        assert scanner.search(text) == bool(expected), text
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_overlapping_and_prefix_keywords_are_all_reported(backend):
+    scanner = KeywordScanner(['headache', 'severe headache', 'severe', 'sever'], backend=backend)
+    assert scanner.scan('A Severe Headache since noon') == {'headache', 'severe headache', 'severe', 'sever'}
+    assert scanner.scan('no pain') == set()
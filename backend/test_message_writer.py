@@ -0,0 +1,62 @@
+"""
+Tests for MessageWriter's batched background inserts
+"""
+import pytest
+
+from database import MediChatDatabase
+from message_writer import MessageWriter
+
+
+@pytest.fixture
+def database(tmp_path):
+    return MediChatDatabase(str(tmp_path / 'medichat.db'))
+
+
+def test_queued_messages_are_written_on_flush(database):
+    writer = MessageWriter(database, max_batch_size=10)
+    writer.save_message('s1', 'user', 'hello', create_session=True)
+    for i in range(25):
+        writer.save_message('s1', 'assistant', f"reply {i}")
+    writer.flush()
+
+    history = database.get_session_history('s1', limit=100)
+    assert len(history) == 26
+
+
+def test_flush_invalidates_cached_history(database):
+    database.create_session('s1')
+    assert database.get_session_history('s1') == []
+
+    writer = MessageWriter(database)
+    writer.save_message('s1', 'user', 'hello')
+    writer.flush()
+
+    assert [m['content'] for m in database.get_session_history('s1')] == ['hello']
+
+
+def test_failed_batch_does_not_block_flush(database, monkeypatch):
+    writer = MessageWriter(database)
+
+    def fail(batch):
+        raise RuntimeError('disk full')
+    monkeypatch.setattr(writer, '_write', fail)
+    writer.save_message('s1', 'user', 'lost')
+    writer.flush()
+
+    monkeypatch.undo()
+    writer.save_message('s1', 'user', 'kept', create_session=True)
+    writer.flush()
+    assert [m['content'] for m in database.get_session_history('s1')] == ['kept']
+
+
+def test_bad_message_only_drops_itself(database):
+    database.create_session('s1')
+    database.create_session('s2')
+    writer = MessageWriter(database, max_wait=0.5)
+    writer.save_message('s1', 'user', 'first')
+    writer.save_message('s2', 'user', None)  # violates messages.content NOT NULL
+    writer.save_message('s2', 'assistant', 'second')
+    writer.flush()
+
+    assert [m['content'] for m in database.get_session_history('s1')] == ['first']
+    assert [m['content'] for m in database.get_session_history('s2')] == ['second']
@@ -0,0 +1,52 @@
+"""
+Tests for saving a registered profile (ProfileRegistrationFlow.save_profile)
+"""
+import pytest
+
+import profile_registration
+from database import MediChatDatabase
+from profile_registration import ProfileRegistrationFlow
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    database = MediChatDatabase(str(tmp_path / 'medichat.db'))
+    monkeypatch.setattr(profile_registration, 'db', database)
+    return database
+
+
+def test_save_profile_with_weight_and_height(database):
+    saved = ProfileRegistrationFlow.save_profile('U1', {
+        'name': 'Ann',
+        'age': 30,
+        'gender': 'female',
+        'weight_kg': 60,
+        'height_cm': 165,
+        'allergies': ['penicillin', 'peanuts'],
+        'chronic_conditions': ['asthma'],
+        'current_medications': ['salbutamol'],
+        'past_injuries': ['knee surgery'],
+    })
+
+    assert saved is True
+    profile = database.get_user_profile('U1')
+    assert profile['bmi'] == 22.0
+    assert [(a['type'], a['name']) for a in profile['allergies']] == [('drug', 'penicillin'), ('food', 'peanuts')]
+    assert [c['name'] for c in profile['chronic_conditions']] == ['asthma']
+    assert [m['name'] for m in profile['current_medications']] == ['salbutamol']
+    assert [s['symptom'] for s in profile['symptom_history']] == ['knee surgery']
+
+
+def test_failed_save_leaves_no_partial_profile(database, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('disk full')
+    monkeypatch.setattr(database, 'add_doctor_note', fail)
+
+    assert ProfileRegistrationFlow.save_profile('U1', {'name': 'Ann', 'allergies': ['dust']}) is False
+    assert database.get_user_profile('U1') is None
+
+
+def test_update_user_profile_sets_updated_at(database):
+    database.create_user_profile('U1', name='Ann')
+    assert database.update_user_profile('U1', age=31) is True
+    assert database.get_user_profile('U1')['age'] == 31
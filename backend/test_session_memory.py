@@ -0,0 +1,92 @@
+"""
+Tests for SessionStore (LRU + TTL eviction) and SessionMemoryManager
+"""
+import threading
+
+import pytest
+
+import session_memory
+from session_memory import SessionMemoryManager, SessionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the session_memory module"""
+    now = [1000.0]
+    monkeypatch.setattr(session_memory.time, 'time', lambda: now[0])
+    return now
+
+
+def test_least_recently_used_session_is_evicted():
+    store = SessionStore(maxsize=2)
+    store['a'] = 1
+    store['b'] = 2
+    assert store['a'] == 1  # 'b' is now the least recently used
+
+    store['c'] = 3
+
+    assert 'b' not in store
+    assert sorted(store) == ['a', 'c']
+
+
+def test_idle_sessions_expire(clock):
+    store = SessionStore(ttl=60)
+    store['a'] = 1
+    clock[0] += 30
+    store['b'] = 2
+    clock[0] += 31
+
+    assert 'a' not in store
+    assert store['b'] == 2
+
+    store.expire()
+    assert list(store) == ['b']
+
+
+def test_access_refreshes_idle_timer(clock):
+    store = SessionStore(ttl=60)
+    store['a'] = 1
+    clock[0] += 50
+    assert store['a'] == 1
+    clock[0] += 50
+
+    assert store.get('a') == 1
+
+
+def test_concurrent_expiry_does_not_raise(clock):
+    store = SessionStore(ttl=60)
+    for i in range(1000):
+        store[i] = i
+    clock[0] += 61
+
+    errors = []
+
+    def touch():
+        try:
+            for i in range(1000):
+                store.get(i)
+                store.expire()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=touch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(store) == 0
+
+
+def test_evicted_session_data_is_not_reused():
+    manager = SessionMemoryManager(max_sessions=1)
+    first = manager.get_memory('s1')
+    first.symptoms.append('headache')
+
+    second = manager.get_memory('s2')
+
+    assert second is not first
+    assert second.symptoms == []
+    assert first.symptoms == ['headache']
+    assert manager.find_memory('s1') is None
@@ -4,8 +4,11 @@
 
 #Step1a: Setup Text to Speech–TTS–model with gTTS
 import os
+import logging
 from gtts import gTTS
 
+logger = logging.getLogger(__name__)
+
 def text_to_speech_with_gtts_old(input_text, output_filepath):
     language="en"
 
@@ -23,6 +26,7 @@ text_to_speech_with_gtts_old(input_text=input_text, output_filepath="gtts_testin
 #Step1b: Setup Text to Speech–TTS–model with ElevenLabs
 import elevenlabs
 from elevenlabs.client import ElevenLabs
+from http_client import http_client
 
 ELEVENLABS_API_KEY=os.environ.get("ELEVEN_API_KEY")
 
@@ -43,7 +47,7 @@ def text_to_speech_with_elevenlabs_old(input_text, output_filepath):
 import subprocess
 import platform
 
-def text_to_speech_with_gtts(input_text, output_filepath):
+def text_to_speech_with_gtts(input_text, output_filepath, autoplay=True):
     language="en"
 
     audioobj= gTTS(
@@ -52,6 +56,8 @@ def text_to_speech_with_gtts(input_text, output_filepath):
         slow=False
     )
     audioobj.save(output_filepath)
+    if not autoplay:
+        return
     os_name = platform.system()
     try:
         if os_name == "Darwin":  # macOS
@@ -70,8 +76,8 @@ input_text="Hi this is Ai with Hassan, autoplay testing!"
 #text_to_speech_with_gtts(input_text=input_text, output_filepath="gtts_testing_autoplay.mp3")
 
 
-def text_to_speech_with_elevenlabs(input_text, output_filepath):
-    client=ElevenLabs(api_key=ELEVENLABS_API_KEY)
+def text_to_speech_with_elevenlabs(input_text, output_filepath, autoplay=True):
+    client=ElevenLabs(api_key=ELEVENLABS_API_KEY, httpx_client=http_client)
     audio=client.generate(
         text= input_text,
         voice= "Aria",
@@ -79,6 +85,8 @@ def text_to_speech_with_elevenlabs(input_text, output_filepath):
         model= "eleven_turbo_v2"
     )
     elevenlabs.save(audio, output_filepath)
+    if not autoplay:
+        return
     os_name = platform.system()
     try:
         if os_name == "Darwin":  # macOS
@@ -92,4 +100,199 @@ def text_to_speech_with_elevenlabs(input_text, output_filepath):
     except Exception as e:
         print(f"An error occurred while trying to play the audio: {e}")
 
-#text_to_speech_with_elevenlabs(input_text, output_filepath="elevenlabs_testing_autoplay.mp3")
\ No newline at end of file
+#text_to_speech_with_elevenlabs(input_text, output_filepath="elevenlabs_testing_autoplay.mp3")
+
+
+#Step3: Stream Text to Speech from ElevenLabs (playback starts at first byte)
+
+ELEVENLABS_VOICE_ID=os.environ.get("ELEVENLABS_VOICE_ID", "9BWtsMINqrJLrRacOk9x")  # "Aria"
+ELEVENLABS_STREAM_MODEL="eleven_turbo_v2_5"
+
+def _elevenlabs_audio_stream(client, input_text):
+    """Yield non-empty MP3 chunks for one piece of text"""
+    audio_stream=client.text_to_speech.convert_as_stream(
+        voice_id=ELEVENLABS_VOICE_ID,
+        text=input_text,
+        model_id=ELEVENLABS_STREAM_MODEL,
+        output_format="mp3_44100_64"
+    )
+    for chunk in audio_stream:
+        if chunk:
+            yield chunk
+
+
+#Step4: Pipeline streamed LLM output into TTS one sentence at a time
+
+import re
+import queue
+import threading
+
+# Sentence end: . ! or ? followed by whitespace, not after Dr/Mr/Mrs/Ms
+# (decimals like 2.5 never match because the dot is followed by a digit)
+SENTENCE_END_RE=re.compile(r'(?<!\bDr)(?<!\bMr)(?<!\bMrs)(?<!\bMs)[.!?](?=\s)')
+
+class SentenceBuffer:
+    """Accumulates streamed LLM tokens and releases complete sentences"""
+    
+    def __init__(self, min_length=10):
+        self.buffer = ""
+        self.min_length = min_length
+    
+    def add(self, token):
+        """Add a token and return the sentences it completed"""
+        self.buffer += token
+        sentences = []
+        start = 0
+        
+        for match in SENTENCE_END_RE.finditer(self.buffer):
+            sentence = self.buffer[start:match.end()].strip()
+            # Short fragments ("Hi.") are merged into the next sentence
+            if len(sentence) >= self.min_length:
+                sentences.append(sentence)
+                start = match.end()
+        
+        self.buffer = self.buffer[start:]
+        return sentences
+    
+    def flush(self):
+        """Return whatever text is left once the token stream ends"""
+        remainder = self.buffer.strip()
+        self.buffer = ""
+        return remainder
+
+def stream_llm_to_speech(token_stream, output_filepath):
+    """
+    Speak a streamed LLM response while it is still being generated
+    
+    Tokens are read on a background thread and split into sentences; each
+    sentence is sent to ElevenLabs as soon as it is complete, so the first
+    audio is ready after the first sentence instead of the whole answer.
+    A sentence ElevenLabs fails on is spoken with gTTS instead, and once its
+    breaker opens the rest of the answer goes straight to gTTS.
+    
+    Args:
+        token_stream: Iterable of text fragments from the LLM
+        output_filepath: File the MP3 chunks are also written to
+    
+    Yields:
+        MP3 audio chunks (bytes)
+    """
+    sentences = queue.Queue()
+    
+    def read_tokens():
+        sentence_buffer = SentenceBuffer()
+        try:
+            for token in token_stream:
+                for sentence in sentence_buffer.add(token):
+                    sentences.put(sentence)
+            remainder = sentence_buffer.flush()
+            if remainder:
+                sentences.put(remainder)
+        except Exception as e:
+            logger.error(f"An error occurred while reading the LLM stream: {str(e)}")
+        finally:
+            sentences.put(None)
+    
+    threading.Thread(target=read_tokens, daemon=True).start()
+    
+    client=ElevenLabs(api_key=ELEVENLABS_API_KEY, httpx_client=http_client)
+    with open(output_filepath, "wb") as audio_file:
+        while True:
+            sentence = sentences.get()
+            if sentence is None:
+                break
+            for chunk in _audio_stream_with_fallback(client, sentence):
+                audio_file.write(chunk)
+                yield chunk
+
+
+#Step5: Skip ElevenLabs while it is failing (circuit breaker) and fall back to gTTS
+
+import io
+import time
+import httpx
+from elevenlabs.core.api_error import ApiError
+
+# Errors that mean ElevenLabs itself is unavailable; anything else is a bug
+ELEVENLABS_ERRORS=(ApiError, httpx.HTTPError)
+
+class CircuitBreaker:
+    """
+    Stops calling a failing provider for a while
+    
+    After fail_max consecutive failures (or a single 429) the breaker opens
+    and callers go straight to their fallback until reset_timeout passes.
+    """
+    
+    def __init__(self, fail_max=3, reset_timeout=30):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.open_until = 0
+        self.lock = threading.Lock()
+    
+    def allow_request(self):
+        return time.time() >= self.open_until
+    
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+    
+    def record_failure(self, error=None):
+        with self.lock:
+            self.failures += 1
+            rate_limited = getattr(error, "status_code", None) == 429
+            if rate_limited or self.failures >= self.fail_max:
+                self.open_until = time.time() + self.reset_timeout
+                self.failures = 0
+
+elevenlabs_breaker=CircuitBreaker()
+
+def text_to_speech_with_fallback(input_text, output_filepath):
+    """Synthesize with ElevenLabs unless its breaker is open, else with gTTS"""
+    if elevenlabs_breaker.allow_request():
+        try:
+            text_to_speech_with_elevenlabs(input_text, output_filepath, autoplay=False)
+            elevenlabs_breaker.record_success()
+            return
+        except ELEVENLABS_ERRORS as e:
+            elevenlabs_breaker.record_failure(e)
+            logger.warning(f"ElevenLabs synthesis failed, falling back to gTTS: {str(e)}")
+    text_to_speech_with_gtts(input_text, output_filepath, autoplay=False)
+
+def _gtts_audio(input_text):
+    """Synthesize text with gTTS and return the MP3 bytes"""
+    audio_file=io.BytesIO()
+    gTTS(text=input_text, lang="en", slow=False).write_to_fp(audio_file)
+    return audio_file.getvalue()
+
+def _audio_stream_with_fallback(client, input_text):
+    """Yield MP3 chunks from ElevenLabs unless its breaker is open, else from gTTS"""
+    if elevenlabs_breaker.allow_request():
+        try:
+            for chunk in _elevenlabs_audio_stream(client, input_text):
+                yield chunk
+            elevenlabs_breaker.record_success()
+            return
+        except ELEVENLABS_ERRORS as e:
+            elevenlabs_breaker.record_failure(e)
+            # Repeating the part already spoken beats dropping the rest
+            logger.warning(f"ElevenLabs streaming failed, falling back to gTTS: {str(e)}")
+    yield _gtts_audio(input_text)
+
+def stream_text_to_speech_with_fallback(input_text, output_filepath):
+    """
+    Stream speech synthesis, falling back to gTTS when ElevenLabs fails
+    
+    Args:
+        input_text: Text to synthesize
+        output_filepath: File the MP3 chunks are also written to
+    
+    Yields:
+        MP3 audio chunks (bytes)
+    """
+    client=ElevenLabs(api_key=ELEVENLABS_API_KEY, httpx_client=http_client)
+    with open(output_filepath, "wb") as audio_file:
+        for chunk in _audio_stream_with_fallback(client, input_text):
+            audio_file.write(chunk)
+            yield chunk
@@ -48,18 +48,30 @@ audio_filepath="patient_voice_test_for_patient.mp3"
 #Step2: Setup Speech to text–STT–model for transcription
 import os
 from groq import Groq
+from http_client import http_client
 
 GROQ_API_KEY=os.environ.get("GROQ_API_KEY")
-stt_model="whisper-large-v3"
+stt_model=os.environ.get("GROQ_STT_MODEL", "whisper-large-v3-turbo")
 
-def transcribe_with_groq(stt_model, audio_filepath, GROQ_API_KEY):
-    client=Groq(api_key=GROQ_API_KEY)
+# Turbo loses accuracy on some Indic languages, use the full model there
+FULL_STT_MODEL="whisper-large-v3"
+FULL_STT_LANGUAGES={"hi", "kn"}
+
+def transcribe_with_groq(stt_model, audio_filepath, GROQ_API_KEY, language="en"):
+    with open(audio_filepath, "rb") as audio_file:
+        return transcribe_bytes_with_groq(stt_model, (os.path.basename(audio_filepath), audio_file.read()), GROQ_API_KEY, language)
+
+def transcribe_bytes_with_groq(stt_model, audio, GROQ_API_KEY, language="en"):
+    """Transcribe an in-memory (filename, bytes) upload without writing it to disk first"""
+    client=Groq(api_key=GROQ_API_KEY, http_client=http_client)
+    
+    if language in FULL_STT_LANGUAGES:
+        stt_model=FULL_STT_MODEL
     
-    audio_file=open(audio_filepath, "rb")
     transcription=client.audio.transcriptions.create(
         model=stt_model,
-        file=audio_file,
-        language="en"
+        file=audio,
+        language=language
     )
 
     return transcription.text